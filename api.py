@@ -0,0 +1,202 @@
+"""Read-only HTTP JSON API over the dashboard's vehicle analysis.
+
+    python api.py --port 8080
+    python api.py --csv telemetry.csv --port 8080
+
+Endpoints (GET) take the query parameters oem, start_date and end_date;
+an end_date without a time covers that whole day:
+
+    /vehicles/<chassis_number>/insights   headline metrics (generate_dynamic_insights)
+    /vehicles/<chassis_number>/daily      DailyRollup rows, one per day
+    /vehicles/<chassis_number>/narrative  customer insight sentences
+    /metrics                              Prometheus text of the stage timings
+    /health
+
+Analyses run through a memo.ResultCache, the same code path as the
+dashboard. Response bodies are cached by endpoint, parameters and code
+version, with an ETag that is a hash of the body; a request whose
+If-None-Match carries that tag gets 304 without a body. At most
+`max_queries` warehouse fetches run at once, however many requests are
+being served; the others wait for a slot. Concurrent requests for the
+same vehicle and range share one analysis instead of each computing it.
+"""
+import argparse
+import datetime
+import hashlib
+import json
+import math
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, unquote, urlsplit
+
+import numpy as np
+import pandas as pd
+
+from instrumentation import REGISTRY, StageRecorder
+from memo import CODE_VERSION, DEFAULT_RAW_TTL, MB, MemoLayer, ResultCache
+from pipeline import build_narrative_insights
+
+DEFAULT_MAX_QUERIES = 4
+ANALYSIS_LOCK_STRIPES = 64
+DEFAULT_PORT = 8080
+JSON_TYPE = 'application/json'
+ENDPOINTS = ('insights', 'daily', 'narrative')
+
+
+class InsightsService:
+    """HTTP-agnostic request handling: handle() returns (status, headers, body).
+
+    `fetch` has the signature of `warehouse.fetch_telemetry`. Cached
+    responses expire with the same time-to-live as raw telemetry, because
+    ranges ending today are still receiving packets.
+    """
+
+    def __init__(self, fetch, max_queries=DEFAULT_MAX_QUERIES, response_mb=64, response_ttl=DEFAULT_RAW_TTL):
+        self.fetch = fetch
+        self.results = ResultCache(self._bounded_fetch)
+        self.responses = MemoLayer('responses', response_mb * MB, response_ttl)
+        self._queries = threading.BoundedSemaphore(max_queries)
+        self._analysis_locks = [threading.Lock() for _ in range(ANALYSIS_LOCK_STRIPES)]
+
+    def handle(self, path, query, if_none_match=None):
+        parts = [unquote(part) for part in path.strip('/').split('/')]
+        if parts == ['health']:
+            return _json_response(200, {'status': 'ok'})
+        if parts == ['metrics']:
+            return 200, {'Content-Type': 'text/plain; version=0.0.4'}, REGISTRY.prometheus_text().encode()
+        if len(parts) != 3 or parts[0] != 'vehicles' or parts[2] not in ENDPOINTS:
+            return _json_response(404, {'error': f"unknown path: {path}"})
+        chassis_number, endpoint = parts[1], parts[2]
+
+        try:
+            oem, start, end = _request_parameters(query)
+        except ValueError as e:
+            return _json_response(400, {'error': str(e)})
+
+        key = (endpoint, oem, chassis_number, start, end, CODE_VERSION)
+        cached = self.responses.get(key)
+        if cached is None:
+            try:
+                payload = self._payload(endpoint, oem, chassis_number, start, end)
+            except LookupError as e:
+                return _json_response(404, {'error': str(e)})
+            except Exception as e:
+                return _json_response(500, {'error': f"{type(e).__name__}: {e}"})
+            body = json.dumps(_finite(payload), default=_json_default, allow_nan=False).encode()
+            cached = self.responses.put(key, (body, f'"{hashlib.blake2b(body, digest_size=16).hexdigest()}"'))
+        body, etag = cached
+
+        headers = {'ETag': etag, 'Cache-Control': 'no-cache'}
+        if if_none_match and (if_none_match.strip() == '*' or etag in [tag.strip() for tag in if_none_match.split(',')]):
+            return 304, headers, b''
+        return 200, dict(headers, **{'Content-Type': JSON_TYPE}), body
+
+    def _bounded_fetch(self, oem, chassis_number, start_date, end_date):
+        with self._queries:
+            return self.fetch(oem, chassis_number, start_date, end_date)
+
+    def _payload(self, endpoint, oem, chassis_number, start, end):
+        recorder = StageRecorder(trace_memory=False)
+        request = (oem, chassis_number, start.strftime('%Y-%m-%d %H:%M:%S'), end.strftime('%Y-%m-%d %H:%M:%S'))
+        with recorder.stage(f'api.{endpoint}'):
+            # Requests for the same analysis wait for the first one and then read it from the ResultCache
+            with self._analysis_locks[hash(request) % ANALYSIS_LOCK_STRIPES]:
+                analysis, _, _ = self.results.analysis(*request, recorder)
+            if analysis.insights is None:
+                raise LookupError("no data for the selected chassis number and date range")
+
+            payload = {'oem': oem, 'chassis_number': chassis_number, 'start_date': start, 'end_date': end}
+            if endpoint == 'insights':
+                payload['insights'] = analysis.insights
+            elif endpoint == 'daily':
+                daily = analysis.daily.reset_index().astype(object)
+                payload['daily'] = daily.where(daily.notna(), None).to_dict(orient='records')
+            else:
+                payload['narrative'] = build_narrative_insights(analysis.insights, analysis.daily, analysis.sessions)
+        return payload
+
+
+class InsightsHandler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        url = urlsplit(self.path)
+        status, headers, body = self.server.service.handle(url.path, parse_qs(url.query), self.headers.get('If-None-Match'))
+        self.send_response(status)
+        for name, value in headers.items():
+            self.send_header(name, value)
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        if not self.server.quiet:
+            super().log_message(format, *args)
+
+
+def make_server(service, host='127.0.0.1', port=DEFAULT_PORT, quiet=False):
+    """A ThreadingHTTPServer serving `service` with one thread per connection; port 0 picks a free port."""
+    server = ThreadingHTTPServer((host, port), InsightsHandler)
+    server.daemon_threads = True
+    server.service = service
+    server.quiet = quiet
+    return server
+
+
+def _request_parameters(query):
+    missing = [name for name in ('oem', 'start_date', 'end_date') if not query.get(name)]
+    if missing:
+        raise ValueError(f"missing query parameters: {', '.join(missing)}")
+    start = pd.Timestamp(query['start_date'][0])
+    end = pd.Timestamp(query['end_date'][0])
+    if len(query['end_date'][0]) <= len('YYYY-MM-DD'):
+        end += pd.Timedelta(days=1) - pd.Timedelta(seconds=1)
+    if start > end:
+        raise ValueError("start_date is after end_date")
+    return query['oem'][0], start, end
+
+
+def _json_response(status, payload):
+    return status, {'Content-Type': JSON_TYPE}, json.dumps(payload).encode()
+
+
+def _finite(value):
+    """The payload with NaN and infinite floats replaced by None, which JSON can carry."""
+    if isinstance(value, dict):
+        return {key: _finite(item) for key, item in value.items()}
+    if isinstance(value, (list, tuple)):
+        return [_finite(item) for item in value]
+    if isinstance(value, (float, np.floating)) and not math.isfinite(value):
+        return None
+    return value
+
+
+def _json_default(value):
+    if isinstance(value, (pd.Timestamp, datetime.date)):
+        return value.isoformat()
+    if isinstance(value, np.generic):
+        return value.item()
+    raise TypeError(f"{type(value).__name__} is not JSON serializable")
+
+
+def main():
+    from fleet_runner import make_fetch
+
+    parser = argparse.ArgumentParser(description="Serve vehicle insights as JSON")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=DEFAULT_PORT)
+    parser.add_argument("--csv", help="read telemetry from this CSV export instead of BigQuery")
+    parser.add_argument("--cache-dir", help="serve telemetry through a TelemetryCache in this directory")
+    parser.add_argument("--max-queries", type=int, default=DEFAULT_MAX_QUERIES, help="concurrent warehouse queries")
+    args = parser.parse_args()
+
+    server = make_server(InsightsService(make_fetch(args.csv, args.cache_dir), args.max_queries), args.host, args.port)
+    print(f"Serving on http://{args.host}:{server.server_address[1]}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+
+
+if __name__ == "__main__":
+    main()
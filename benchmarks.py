@@ -0,0 +1,452 @@
+import argparse
+import json
+import os
+import platform
+import subprocess
+import tempfile
+import time
+import tracemalloc
+
+import numpy as np
+
+DEFAULT_SCALES = ((1, 1), (1, 30), (1, 365), (1, 1095), (10, 30), (100, 7), (1000, 1))
+
+
+def bench_quantile_sketch(sizes=(10_000, 100_000, 1_000_000), ks=(100, 200, 800), chunks=100, seed=0):
+    """Accuracy and speed of KLL IQR bounds against the exact pandas quantile."""
+    import pandas as pd
+
+    from quantile_sketch import KLLSketch, iqr_bounds
+
+    rng = np.random.default_rng(seed)
+    results = []
+    for size in sizes:
+        odometer = pd.Series(np.cumsum(rng.random(size)) + rng.normal(0, 5, size))
+
+        start = time.perf_counter()
+        q1, q3 = odometer.quantile([0.25, 0.75])
+        exact_seconds = time.perf_counter() - start
+        exact_lower, exact_upper = q1 - 1.5 * (q3 - q1), q3 + 1.5 * (q3 - q1)
+
+        for k in ks:
+            start = time.perf_counter()
+            sketch = KLLSketch(k).update(odometer.values)
+            lower, upper = iqr_bounds(sketch)
+            sketch_seconds = time.perf_counter() - start
+
+            start = time.perf_counter()
+            merged = KLLSketch(k)
+            for chunk in np.array_split(odometer.values, chunks):
+                merged.merge(KLLSketch(k).update(chunk))
+            merged_seconds = time.perf_counter() - start
+
+            sketch_q1, sketch_q3 = sketch.quantiles([0.25, 0.75])
+            results.append({
+                'rows': size,
+                'k': k,
+                'exact_seconds': exact_seconds,
+                'sketch_seconds': sketch_seconds,
+                'chunked_merge_seconds': merged_seconds,
+                'q1_rank_error': abs((odometer < sketch_q1).mean() - 0.25),
+                'q3_rank_error': abs((odometer < sketch_q3).mean() - 0.75),
+                'lower_bound_error': abs(lower - exact_lower),
+                'upper_bound_error': abs(upper - exact_upper),
+                'retained_items': sum(len(items) for items in sketch.levels)
+            })
+    return results
+
+
+def bench_sql_pushdown(days=(7, 30, 180), seed=0):
+    """Check the SQLite pushdown rollup against the pandas path and compare transferred cells."""
+    import sqlite3
+
+    import pandas as pd
+
+    from daily_rollup import DailyRollup
+    from running_hours import daily_running_hours
+    from sql_pushdown import query_daily_rollup
+
+    rng = np.random.default_rng(seed)
+    results = []
+    for day_count in days:
+        rows = day_count * 1440
+        df = pd.DataFrame({
+            'chassis_number': 'BENCH',
+            'recorded_at': pd.date_range('2024-01-01', periods=rows, freq='min'),
+            'odometer': np.cumsum(rng.random(rows)),
+            'soc': np.clip(50 + rng.normal(0, 1, rows).cumsum(), 0, 100),
+            'key_on': rng.integers(0, 2, rows)
+        })
+        connection = sqlite3.connect(':memory:')
+        df.to_sql('telemetry', connection, index=False)
+        end_date = df['recorded_at'].max()
+
+        start = time.perf_counter()
+        pushed = query_daily_rollup(connection, 'telemetry', 'BENCH', '2024-01-01', end_date)
+        sql_seconds = time.perf_counter() - start
+
+        start = time.perf_counter()
+        expected = DailyRollup.from_frame(df)
+        hours = daily_running_hours(df).set_index('Date').reindex(expected.index).fillna(0)
+        pandas_seconds = time.perf_counter() - start
+
+        numeric = [column for column in expected.columns if column not in ('run_start', 'run_end')]
+        matches = (
+            all(np.allclose(pushed[column].astype(float), expected[column].astype(float)) for column in numeric) and
+            pushed['run_start'].equals(expected['run_start']) and
+            pushed['run_end'].equals(expected['run_end']) and
+            np.allclose(pushed['daytime_hours'], hours['Daytime Hours']) and
+            np.allclose(pushed['nighttime_hours'], hours['Nighttime Hours'])
+        )
+        results.append({
+            'days': day_count,
+            'raw_cells': int(df.size),
+            'pushdown_cells': int(pushed.size),
+            'transfer_reduction': df.size / pushed.size,
+            'sql_seconds': sql_seconds,
+            'pandas_seconds': pandas_seconds,
+            'matches_pandas': bool(matches)
+        })
+    return results
+
+
+def bench_daily_rollup(days=(30, 365), cadence='60s', max_ratio=1.5, seed=0):
+    """Peak memory of DailyRollup on one vehicle, checked against `max_ratio` times the normalized frame."""
+    from daily_rollup import DailyRollup
+    from schema import normalize_telemetry
+    from synthetic import generate_telemetry
+
+    results = []
+    for day_count in days:
+        df = normalize_telemetry(generate_telemetry('BENCH', days=day_count, cadence=cadence, seed=seed))
+        frame_bytes = df.memory_usage(deep=True).sum()
+        _, seconds, peak_bytes = measure(DailyRollup.from_frame, df)
+        results.append({
+            'days': day_count,
+            'rows': len(df),
+            'frame_mb': frame_bytes / 1024 ** 2,
+            'peak_mb': peak_bytes / 1024 ** 2,
+            'peak_ratio': peak_bytes / frame_bytes,
+            'within_budget': bool(peak_bytes <= max_ratio * frame_bytes),
+            'seconds': seconds
+        })
+    return results
+
+
+def bench_fleet_matrix(vehicles=(100, 1000, 10_000), days=365, oems=5, missing=0.1, seed=0):
+    """Build and summary time of the vehicles x days fleet matrices."""
+    import pandas as pd
+
+    from fleet_matrix import FleetMatrix, cohort_percentiles, fleet_summary, rolling_zscores
+
+    rng = np.random.default_rng(seed)
+    results = []
+    for vehicle_count in vehicles:
+        cells = vehicle_count * days
+        distance = rng.gamma(4, 30, cells)
+        frame = pd.DataFrame({
+            'oem': np.repeat(rng.integers(0, oems, vehicle_count).astype(str), days),
+            'chassis_number': np.repeat(np.arange(vehicle_count).astype(str), days),
+            'date': np.tile(pd.date_range('2024-01-01', periods=days).values, vehicle_count),
+            'distance': distance,
+            'fce': distance / 150,
+            'soc_charge': distance / 2
+        })[rng.random(cells) >= missing]
+
+        start = time.perf_counter()
+        fleet = FleetMatrix.from_long(frame)
+        build_seconds = time.perf_counter() - start
+
+        start = time.perf_counter()
+        cohort_percentiles(fleet, 'distance')
+        percentile_seconds = time.perf_counter() - start
+
+        start = time.perf_counter()
+        rolling_zscores(fleet, 'distance')
+        zscore_seconds = time.perf_counter() - start
+
+        start = time.perf_counter()
+        fleet_summary(fleet)
+        summary_seconds = time.perf_counter() - start
+
+        results.append({
+            'vehicles': vehicle_count,
+            'days': days,
+            'vehicle_days': len(frame),
+            'build_seconds': build_seconds,
+            'percentile_seconds': percentile_seconds,
+            'zscore_seconds': zscore_seconds,
+            'summary_seconds': summary_seconds
+        })
+    return results
+
+
+def bench_api(vehicles=4, days=30, requests=200, concurrency=(1, 8), latency=0.05, max_queries=4, seed=0):
+    """Throughput of the JSON API: cold requests, cached responses and 304 revalidations.
+
+    The warehouse is a synthetic fleet behind a stub fetch that sleeps
+    `latency` seconds per query.
+    """
+    import threading
+    import urllib.error
+    import urllib.request
+    from concurrent.futures import ThreadPoolExecutor
+
+    import pandas as pd
+
+    from api import ENDPOINTS, InsightsService, make_server
+    from synthetic import generate_fleet
+
+    fleet = generate_fleet(vehicles, days, seed=seed)
+    fleet['recorded_at'] = fleet['recorded_at'].dt.tz_localize(None)
+    frames = dict(tuple(fleet.groupby('chassis_number', observed=True)))
+    end_date = (pd.Timestamp('2024-01-01') + pd.Timedelta(days=days - 1)).date()
+
+    def fetch(oem, chassis_number, start_date, end_date):
+        time.sleep(latency)
+        df = frames[chassis_number]
+        return df[(df['recorded_at'] >= start_date) & (df['recorded_at'] <= end_date)]
+
+    def get(url, etag=None):
+        request = urllib.request.Request(url, headers={'If-None-Match': etag} if etag else {})
+        started = time.perf_counter()
+        try:
+            with urllib.request.urlopen(request) as response:
+                response.read()
+                status, etag = response.status, response.headers['ETag']
+        except urllib.error.HTTPError as e:
+            status, etag = e.code, e.headers['ETag']
+        return status, etag, time.perf_counter() - started
+
+    def run(urls, workers, etags=None):
+        started = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            responses = list(executor.map(lambda url: get(url, etags and etags[url]), urls))
+        return responses, time.perf_counter() - started
+
+    results = []
+    for workers in concurrency:
+        server = make_server(InsightsService(fetch, max_queries), port=0, quiet=True)
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        base = f"http://127.0.0.1:{server.server_address[1]}"
+        urls = [
+            f"{base}/vehicles/{chassis_number}/{endpoint}?oem=Synthetic&start_date=2024-01-01&end_date={end_date}"
+            for chassis_number in frames for endpoint in ENDPOINTS
+        ]
+        try:
+            cold, cold_seconds = run(urls, workers)
+            etags = {url: etag for url, (_, etag, _) in zip(urls, cold)}
+            repeated = [urls[index % len(urls)] for index in range(requests)]
+            warm, warm_seconds = run(repeated, workers)
+            revalidated, revalidated_seconds = run(repeated, workers, etags)
+        finally:
+            server.shutdown()
+            server.server_close()
+
+        warm_latency = np.array([seconds for _, _, seconds in warm])
+        results.append({
+            'concurrency': workers,
+            'vehicles': vehicles,
+            'days': days,
+            'cold_requests': len(urls),
+            'cold_seconds': cold_seconds,
+            'cold_ok': all(status == 200 for status, _, _ in cold),
+            'warm_requests_per_second': requests / warm_seconds,
+            'warm_p50_ms': float(np.percentile(warm_latency, 50) * 1000),
+            'warm_p95_ms': float(np.percentile(warm_latency, 95) * 1000),
+            'not_modified_requests_per_second': requests / revalidated_seconds,
+            'not_modified': all(status == 304 for status, _, _ in revalidated)
+        })
+    return results
+
+
+def measure(fn, *args, memory=True):
+    """Run fn once for wall time and, if requested, again under tracemalloc for peak memory."""
+    start = time.perf_counter()
+    result = fn(*args)
+    seconds = time.perf_counter() - start
+
+    peak_bytes = None
+    if memory:
+        tracemalloc.start()
+        fn(*args)
+        peak_bytes = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+    return result, seconds, peak_bytes
+
+
+def bench_stages(scales=DEFAULT_SCALES, memory=True, seed=0):
+    """Time and memory-profile each dashboard stage on synthetic fleets of increasing size."""
+    import pandas as pd
+
+    import figures
+    from daily_rollup import DailyRollup
+    from fce import segment_fce_cycles
+    from pipeline import build_narrative_insights, clean_odometer, filter_vehicle
+    from pipeline import utilization_moving_averages
+    from insights import generate_dynamic_insights
+    from running_hours import daily_running_hours
+    from schema import normalize_telemetry
+    from sessions import sessionize
+    from synthetic import generate_fleet
+
+    def build_figures(daily, running_hours_df, sessions, utilization_df):
+        built = [
+            figures.utilization_figure(daily),
+            figures.fce_figure(daily),
+            figures.day_night_figure(running_hours_df),
+            figures.charging_figure(daily, sessions),
+            figures.idle_soc_figure(sessions.charging),
+            figures.moving_average_figure(utilization_df)
+        ]
+        return sum(len(fig.to_json()) for fig in built)
+
+    def insights_stage(daily, sessions):
+        insights = generate_dynamic_insights(daily, sessions)
+        return insights, build_narrative_insights(insights, daily, sessions)
+
+    results = []
+    for vehicles, days in scales:
+        fleet = generate_fleet(vehicles, days, seed=seed, packet_loss=0.01, odometer_glitch_rate=1e-4)
+        start_date = '2024-01-01'
+        end_date = pd.Timestamp(start_date) + pd.Timedelta(days=days)
+        totals = {}
+
+        def record(stage, seconds, peak_bytes):
+            total = totals.setdefault(stage, {'seconds': 0.0, 'peak_bytes': 0})
+            total['seconds'] += seconds
+            total['peak_bytes'] = max(total['peak_bytes'], peak_bytes or 0)
+
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, 'fleet.parquet')
+            fleet.to_parquet(path, index=False)
+            del fleet
+            df, seconds, peak_bytes = measure(pd.read_parquet, path, memory=memory)
+            record('load', seconds, peak_bytes)
+
+        def run(stage, fn, *args):
+            result, seconds, peak_bytes = measure(fn, *args, memory=memory)
+            record(stage, seconds, peak_bytes)
+            return result
+
+        df = run('normalize', normalize_telemetry, df)
+        payload_bytes = 0
+        for chassis_number, vehicle in df.groupby('chassis_number', sort=False, observed=True):
+            df_filtered, _ = filter_vehicle(vehicle, chassis_number, start_date, end_date)
+            df_clean = run('iqr_cleaning', clean_odometer, df_filtered)
+            daily = run('daily_rollup', DailyRollup.from_frame, df_clean)
+            run('fce_segments', segment_fce_cycles, daily['fce'])
+            running_hours_df = run('day_night', daily_running_hours, df_clean)
+            sessions = run('sessions', sessionize, df_clean)
+            utilization_df = run('moving_averages', utilization_moving_averages, daily)
+            run('insights', insights_stage, daily, sessions)
+            payload_bytes += run('figures', build_figures, daily, running_hours_df, sessions, utilization_df)
+
+        for stage, total in totals.items():
+            results.append({
+                'vehicles': vehicles,
+                'days': days,
+                'rows': len(df),
+                'stage': stage,
+                'seconds': total['seconds'],
+                'peak_mb': total['peak_bytes'] / 1024 ** 2 if memory else None
+            })
+        results.append({
+            'vehicles': vehicles, 'days': days, 'rows': len(df),
+            'stage': 'figure_payload', 'seconds': None, 'peak_mb': None, 'payload_bytes': payload_bytes
+        })
+    return results
+
+
+def compare(baseline_path, candidate_path):
+    """Per-stage time ratios between two `stages` result files (candidate / baseline)."""
+    with open(baseline_path) as f:
+        baseline = json.load(f)
+    with open(candidate_path) as f:
+        candidate = json.load(f)
+
+    def key(result):
+        return result['vehicles'], result['days'], result['stage']
+
+    before = {key(result): result for result in baseline['results']}
+    rows = []
+    for result in candidate['results']:
+        previous = before.get(key(result))
+        if previous is None or not previous.get('seconds') or result.get('seconds') is None:
+            continue
+        rows.append({
+            'vehicles': result['vehicles'],
+            'days': result['days'],
+            'stage': result['stage'],
+            'baseline_seconds': previous['seconds'],
+            'candidate_seconds': result['seconds'],
+            'ratio': result['seconds'] / previous['seconds']
+        })
+    return rows
+
+
+def run_metadata():
+    try:
+        commit = subprocess.run(
+            ["git", "rev-parse", "HEAD"], capture_output=True, text=True, check=True,
+            cwd=os.path.dirname(os.path.abspath(__file__))
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        commit = None
+
+    import pandas as pd
+
+    return {
+        'commit': commit,
+        'timestamp': time.strftime('%Y-%m-%dT%H:%M:%S'),
+        'python': platform.python_version(),
+        'pandas': pd.__version__,
+        'numpy': np.__version__,
+        'machine': platform.machine()
+    }
+
+
+def parse_scales(text):
+    """'1x30,10x7' -> ((1, 30), (10, 7)) as (vehicles, days) pairs."""
+    return tuple(tuple(int(part) for part in scale.split('x')) for scale in text.split(','))
+
+
+BENCHMARKS = {
+    'quantile': bench_quantile_sketch,
+    'pushdown': bench_sql_pushdown,
+    'stages': bench_stages,
+    'rollup': bench_daily_rollup,
+    'fleet': bench_fleet_matrix,
+    'api': bench_api
+}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Vehicle analytics benchmarks")
+    parser.add_argument("benchmark", choices=sorted(BENCHMARKS) + ['compare'])
+    parser.add_argument("files", nargs='*', help="for compare: baseline and candidate result files")
+    parser.add_argument("--output", help="write results as JSON to this file")
+    parser.add_argument("--scales", type=parse_scales, help="stages only: VEHICLESxDAYS pairs, e.g. 1x30,10x7")
+    parser.add_argument("--no-memory", action="store_true", help="stages only: skip tracemalloc peak measurement")
+    args = parser.parse_args()
+
+    if args.benchmark == 'compare':
+        output = compare(*args.files)
+    else:
+        kwargs = {}
+        if args.benchmark == 'stages':
+            kwargs['memory'] = not args.no_memory
+            if args.scales:
+                kwargs['scales'] = args.scales
+        output = {'benchmark': args.benchmark, 'meta': run_metadata(), 'results': BENCHMARKS[args.benchmark](**kwargs)}
+
+    text = json.dumps(output, indent=2, default=float)
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write(text)
+    else:
+        print(text)
+
+
+if __name__ == "__main__":
+    main()
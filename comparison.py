@@ -0,0 +1,74 @@
+"""Several vehicles analysed side by side over the same period.
+
+compare_vehicles() runs one `analyze(oem, chassis_number, start_date,
+end_date)` call per chassis on a bounded thread pool. Warehouse queries
+spend their time waiting on the network with the GIL released, so N
+vehicles take about as long as the slowest one. The dashboard passes its
+memoized ResultCache.analysis, so compared vehicles share the caches of
+the single-vehicle view.
+"""
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+
+import pandas as pd
+
+from pipeline import vehicle_metrics
+from sessions import daily_session_totals
+
+DEFAULT_WORKERS = 8
+
+
+@dataclass
+class Comparison:
+    analyses: dict = field(default_factory=dict)
+    errors: dict = field(default_factory=dict)
+
+
+def parse_chassis_numbers(text):
+    """Unique chassis numbers from text separated by commas, spaces or newlines, in input order."""
+    return list(dict.fromkeys(text.replace(',', ' ').split()))
+
+
+def compare_vehicles(oem, chassis_numbers, start_date, end_date, analyze, workers=DEFAULT_WORKERS):
+    """VehicleAnalysis per chassis, computed concurrently; failures are collected in `errors`."""
+    comparison = Comparison()
+    if not chassis_numbers:
+        return comparison
+
+    with ThreadPoolExecutor(max_workers=min(workers, len(chassis_numbers))) as executor:
+        futures = {
+            chassis_number: executor.submit(analyze, oem, chassis_number, start_date, end_date)
+            for chassis_number in chassis_numbers
+        }
+
+    for chassis_number, future in futures.items():
+        try:
+            analysis = future.result()
+        except Exception as e:
+            comparison.errors[chassis_number] = f"{type(e).__name__}: {e}"
+            continue
+        if analysis.insights is None:
+            comparison.errors[chassis_number] = "no data for the selected date range"
+        else:
+            comparison.analyses[chassis_number] = analysis
+    return comparison
+
+
+def comparison_table(comparison):
+    """Headline metrics with one row per compared chassis."""
+    return pd.DataFrame.from_dict(
+        {chassis_number: vehicle_metrics(analysis.daily, analysis.insights)
+         for chassis_number, analysis in comparison.analyses.items()},
+        orient='index'
+    ).rename_axis('chassis_number')
+
+
+def daily_series(comparison, column):
+    """One column per chassis of a DailyRollup or daily session-total column, indexed by date."""
+    series = {}
+    for chassis_number, analysis in comparison.analyses.items():
+        if column in analysis.daily.columns:
+            series[chassis_number] = analysis.daily[column]
+        else:
+            series[chassis_number] = daily_session_totals(analysis.sessions, analysis.daily.index)[column]
+    return pd.DataFrame(series)
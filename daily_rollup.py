@@ -0,0 +1,153 @@
+import numpy as np
+import pandas as pd
+
+AGGREGATIONS = {
+    'distance': 'sum',
+    'distance_positive': 'sum',
+    'soc_discharge': 'sum',
+    'soc_charge': 'sum',
+    'soc_net': 'sum',
+    'charge_events': 'sum',
+    'samples': 'sum',
+    'key_on_samples': 'sum',
+    'key_off_samples': 'sum',
+    'run_start': 'min',
+    'run_end': 'max',
+    'odometer_max': 'max',
+    'soc_min': 'min'
+}
+
+
+class DailyRollup:
+    """Per-day metrics of one vehicle's telemetry, reduced column by column over each day's rows.
+
+    Columns of the result, indexed by day:
+        distance           sum of odometer deltas, including the one across midnight
+        distance_positive  sum of positive odometer deltas within the day
+        soc_discharge      sum of SOC drops within the day
+        soc_charge         sum of SOC rises
+        soc_net            sum of SOC deltas
+        charge_events      number of samples with a SOC rise
+        samples, key_on_samples, key_off_samples
+        run_start, run_end first and last key-on timestamp
+        odometer_max, soc_min
+        fce                soc_discharge / 100
+
+    Frames can be added in chronological chunks; the last sample of each
+    chunk is carried over so deltas across chunk boundaries are counted once.
+    """
+
+    def __init__(self, previous=None):
+        self.previous = previous
+        self._partial = None
+
+    @classmethod
+    def from_frame(cls, df):
+        rollup = cls()
+        rollup.add(df)
+        return rollup.result()
+
+    def add(self, df):
+        if df.empty:
+            return self
+        if not df['recorded_at'].is_monotonic_increasing:
+            df = df.sort_values(by='recorded_at', ignore_index=True)
+        recorded_at = df['recorded_at']
+        soc = _float_values(df['soc'])
+        odometer = _float_values(df['odometer'])
+        key_on = df['key_on'].to_numpy()
+        previous = self.previous or {}
+
+        # Rows are in time order, so each day is one contiguous run starting at `starts`
+        day = recorded_at.dt.normalize().values
+        starts = np.flatnonzero(np.r_[True, day[1:] != day[:-1]])
+        new_day = np.zeros(len(df), dtype=bool)
+        new_day[starts[1:]] = True
+        if previous:
+            new_day[0] = day[0] != pd.Timestamp(previous['recorded_at']).normalize().to_datetime64()
+        days = day[starts]
+        del day
+
+        # Each column is reduced straight into the daily table through two
+        # reused buffers, so no per-sample frame is built
+        diff = _deltas(odometer, previous.get('odometer'), np.empty(len(df)))
+        work = np.empty(len(df))
+        daily = {'distance': _day_sums(diff, starts, work)}
+        daily['distance_positive'] = _day_sums(np.maximum(diff, 0.0, out=work), starts, work, new_day)
+
+        diff = _deltas(soc, previous.get('soc'), diff)
+        daily['soc_discharge'] = _day_sums(np.maximum(np.negative(diff, out=work), 0.0, out=work), starts, work, new_day)
+        daily['soc_charge'] = _day_sums(np.maximum(diff, 0.0, out=work), starts, work)
+        daily['soc_net'] = _day_sums(diff, starts, work)
+        daily['charge_events'] = np.add.reduceat(diff > 0, starts, dtype=np.int64)
+        del diff, work
+
+        key_on_rows = key_on == 1
+        daily.update({
+            'samples': np.diff(np.r_[starts, len(df)]),
+            'key_on_samples': np.add.reduceat(key_on_rows, starts, dtype=np.int64),
+            'key_off_samples': np.add.reduceat(key_on == 0, starts, dtype=np.int64),
+            'run_start': _day_timestamps(recorded_at, key_on_rows, starts, first=True),
+            'run_end': _day_timestamps(recorded_at, key_on_rows, starts, first=False),
+            'odometer_max': np.fmax.reduceat(odometer, starts),
+            'soc_min': np.fmin.reduceat(soc, starts).astype('float64')
+        })
+        daily = pd.DataFrame(daily, index=days)
+
+        if self._partial is not None:
+            daily = pd.concat([self._partial, daily]).groupby(level=0).agg(AGGREGATIONS)
+        self._partial = daily
+
+        last = df.iloc[-1]
+        self.previous = {'recorded_at': last['recorded_at'], 'soc': last['soc'], 'odometer': last['odometer']}
+        return self
+
+    def result(self):
+        if self._partial is None:
+            daily = pd.DataFrame(columns=list(AGGREGATIONS))
+        else:
+            daily = self._partial.copy()
+        daily.index = pd.DatetimeIndex(daily.index, name='date')
+        daily['fce'] = daily['soc_discharge'] / 100
+        return daily
+
+
+def _float_values(series):
+    # float32 SOC stays float32 here; differences are taken in float64
+    if series.dtype.kind == 'f':
+        return series.to_numpy()
+    return series.to_numpy(dtype='float64', na_value=np.nan)
+
+
+def _deltas(values, previous, out):
+    """Float64 differences between consecutive values into `out`; the first is from `previous` (NaN without one)."""
+    np.subtract(values[1:], values[:-1], out=out[1:], dtype='float64')
+    out[0] = values[0] - previous if previous is not None else np.nan
+    return out
+
+
+def _day_sums(values, starts, work, exclude=None):
+    """Per-day sums of `values` with NaNs and `exclude`d rows counted as zero; `work` may be `values`."""
+    if values is not work:
+        np.copyto(work, values)
+    work[np.isnan(work)] = 0.0
+    if exclude is not None:
+        work[exclude] = 0.0
+    return np.add.reduceat(work, starts)
+
+
+def _day_timestamps(recorded_at, selected, starts, first):
+    """First (or last) selected timestamp of each day, NaT for days with none selected."""
+    positions = np.flatnonzero(selected)
+    ends = np.r_[starts[1:], len(selected)]
+    if first:
+        chosen = np.searchsorted(positions, starts)
+        found = chosen < len(positions)
+        chosen = positions[np.where(found, chosen, 0)] if len(positions) else starts
+        found &= chosen < ends
+    else:
+        chosen = np.searchsorted(positions, ends) - 1
+        found = chosen >= 0
+        chosen = positions[np.where(found, chosen, 0)] if len(positions) else starts
+        found &= chosen >= starts
+    return recorded_at.iloc[np.where(found, chosen, 0)].where(found).array
@@ -0,0 +1,106 @@
+"""Downsampling of time series for charts, sized to the chart's pixel width.
+
+Two samplers pick which points to keep:
+
+    lttb    largest-triangle-three-buckets; keeps the visual shape of a line
+    minmax  lowest and highest point of each bucket; keeps every spike
+
+time_series_trace() downsamples when a series has more points than the
+chart has pixels, so the Plotly payload stays bounded however long the
+date range is. At that size SVG renders fine and no WebGL trace is
+needed. Bar charts are bounded with bar_buckets(), which groups days into
+equal multi-day bars once there are more days than pixels.
+"""
+import numpy as np
+import pandas as pd
+import plotly.graph_objs as go
+
+POINTS_PER_PIXEL = 1
+
+
+def lttb_indices(x, y, threshold):
+    """Positions of the `threshold` points LTTB keeps, first and last included."""
+    n = len(x)
+    if threshold >= n or threshold < 3:
+        return np.arange(n)
+
+    x = _as_float(x)
+    y = np.asarray(y, dtype='float64')
+    edges = np.linspace(1, n - 1, threshold - 1).astype(int)
+    selected = np.empty(threshold, dtype=int)
+    selected[0] = 0
+    a = 0
+    for bucket in range(threshold - 2):
+        start, end = edges[bucket], edges[bucket + 1]
+        if bucket + 2 < len(edges):
+            next_start, next_end = edges[bucket + 1], edges[bucket + 2]
+        else:
+            next_start, next_end = n - 1, n
+        avg_x = x[next_start:next_end].mean()
+        avg_y = y[next_start:next_end].mean()
+        area = np.abs((x[a] - avg_x) * (y[start:end] - y[a]) - (x[a] - x[start:end]) * (avg_y - y[a]))
+        a = start + int(np.argmax(area))
+        selected[bucket + 1] = a
+    selected[-1] = n - 1
+    return selected
+
+
+def minmax_indices(y, buckets):
+    """Positions of the lowest and highest point of each of `buckets` equal-count buckets, in order."""
+    n = len(y)
+    if 2 * buckets >= n:
+        return np.arange(n)
+    values = pd.Series(np.asarray(y, dtype='float64'))
+    bucket = np.arange(n) * buckets // n
+    grouped = values.groupby(bucket)
+    return np.unique(np.concatenate([grouped.idxmin().values, grouped.idxmax().values]))
+
+
+def time_series_trace(x, y, width_px, method='lttb', customdata=None, **kwargs):
+    """A Scatter trace of at most about `width_px` points of (x, y).
+
+    NaN values of y are dropped first. `customdata` rows are kept aligned
+    with the surviving points.
+    """
+    x = np.asarray(x)
+    y = np.asarray(y, dtype='float64')
+    keep = ~np.isnan(y)
+    if not keep.all():
+        x, y = x[keep], y[keep]
+        customdata = np.asarray(customdata)[keep] if customdata is not None else None
+
+    max_points = width_px * POINTS_PER_PIXEL
+    if len(x) > max_points:
+        if method == 'lttb':
+            positions = lttb_indices(x, y, max_points)
+        elif method == 'minmax':
+            positions = minmax_indices(y, max_points // 2)
+        else:
+            raise ValueError(f"unknown downsampling method: {method}")
+        x, y = x[positions], y[positions]
+        customdata = np.asarray(customdata)[positions] if customdata is not None else None
+
+    if customdata is not None:
+        kwargs['customdata'] = customdata
+    return go.Scatter(x=x, y=y, **kwargs)
+
+
+def bar_buckets(dates, width_px):
+    """First day of the bar each date falls in; days are grouped so at most `width_px` bars remain."""
+    dates = pd.DatetimeIndex(dates)
+    if len(dates) == 0:
+        return dates
+    first = dates.min()
+    span = (dates.max() - first).days + 1
+    days_per_bar = -(-span // width_px)
+    if days_per_bar <= 1:
+        return dates
+    offset = (dates - first).days // days_per_bar * days_per_bar
+    return first + pd.to_timedelta(offset, unit='D')
+
+
+def _as_float(x):
+    x = np.asarray(x)
+    if np.issubdtype(x.dtype, np.datetime64):
+        return x.astype('datetime64[ns]').astype('int64').astype('float64')
+    return x.astype('float64')
@@ -0,0 +1,27 @@
+import numpy as np
+
+
+def segment_fce_cycles(fce, eps=1e-9):
+    """Split daily FCE values into pieces that each belong to one full cycle.
+
+    A cycle ends every time the running FCE total crosses a whole number, so
+    the boundaries are the union of the cumulative sums and the integers
+    below the grand total. Returns three aligned arrays: the position of the
+    day each piece belongs to, the size of the piece, and its cycle number.
+    """
+    fce = np.clip(np.asarray(fce, dtype=float), 0, None)
+    if fce.size == 0:
+        return np.empty(0, dtype=int), np.empty(0), np.empty(0, dtype=int)
+
+    cumulative = np.cumsum(fce)
+    whole_cycles = np.arange(1, np.floor(cumulative[-1]) + 1)
+    edges = np.unique(np.concatenate([[0.0], cumulative, whole_cycles]))
+
+    starts = edges[:-1]
+    sizes = np.diff(edges)
+    keep = sizes > eps
+    starts, sizes = starts[keep], sizes[keep]
+
+    day_positions = np.searchsorted(cumulative, starts, side='right')
+    cycles = np.floor(starts + eps).astype(int)
+    return day_positions, sizes, cycles
@@ -0,0 +1,373 @@
+import pandas as pd
+import plotly.graph_objs as go
+
+from downsample import bar_buckets, time_series_trace
+from fce import segment_fce_cycles
+from sessions import daily_session_totals
+
+CYCLE_COLORS = ['skyblue', 'salmon', 'lightgreen', 'orange', 'purple']
+CHART_WIDTH = 1000
+
+
+def in_window(df, window, column=None):
+    """Rows whose date (the index, or `column`) lies within the (first_day, last_day) window, inclusive."""
+    if window is None:
+        return df
+    values = df.index if column is None else df[column]
+    first_day = pd.Timestamp(window[0]).normalize()
+    after_last_day = pd.Timestamp(window[1]).normalize() + pd.Timedelta(days=1)
+    return df[(values >= first_day) & (values < after_last_day)]
+
+
+def utilization_figure(daily, window=None):
+    """Daily distance covered."""
+    daily = in_window(daily, window)
+    fig_utilization = go.Figure(
+        data=time_series_trace(
+            daily.index,
+            daily['distance'],
+            CHART_WIDTH,
+            mode='lines+markers',
+            marker=dict(size=6, color='blue'),
+            name="Daily Distance Covered",
+            hovertemplate="Date: %{x}<br>Distance Covered: %{y} km<extra></extra>"
+        )
+    )
+
+    fig_utilization.update_layout(
+        title="Daily Average Utilization",
+        xaxis_title="Date",
+        yaxis_title="Distance Covered (km)",
+        template="plotly_white",
+        hovermode="x unified",
+        width=CHART_WIDTH,
+        height=600
+    )
+
+    return fig_utilization
+
+
+def fce_figure(daily, window=None):
+    """Daily FCE stacked by charge cycle, with distance on a second axis.
+
+    Cycles are numbered over the whole table before the window is applied.
+    """
+    summary_df = pd.DataFrame({
+        'Date': daily.index,
+        'Cumulative FCE': daily['fce'].values,
+        'Distance Covered (km)': daily['distance_positive'].values
+    })
+
+    day_positions, segment_fce, segment_cycles = segment_fce_cycles(summary_df['Cumulative FCE'])
+    segment_dates = summary_df['Date'].values[day_positions]
+    if window is not None:
+        visible = summary_df.index.isin(in_window(summary_df, window, 'Date').index)
+        segment_visible = visible[day_positions]
+        segment_dates = segment_dates[segment_visible]
+        segment_fce = segment_fce[segment_visible]
+        segment_cycles = segment_cycles[segment_visible]
+        summary_df = summary_df[visible]
+
+    bars = pd.DataFrame({
+        'bar': bar_buckets(segment_dates, CHART_WIDTH),
+        'cycle': segment_cycles,
+        'fce': segment_fce
+    }).groupby(['bar', 'cycle'], sort=False, as_index=False)['fce'].sum()
+    segment_dates, segment_cycles, segment_fce = bars['bar'].values, bars['cycle'].values, bars['fce'].values
+
+    fig_fce = go.Figure()
+
+    for color_index, color in enumerate(CYCLE_COLORS):
+        in_color = segment_cycles % len(CYCLE_COLORS) == color_index
+        if not in_color.any():
+            continue
+        fig_fce.add_trace(
+            go.Bar(
+                x=segment_dates[in_color],
+                y=segment_fce[in_color],
+                customdata=segment_cycles[in_color] + 1,
+                name=f"Cycle colour {color_index + 1}",
+                marker=dict(color=color),
+                showlegend=False,
+                hovertemplate="Date: %{x}<br>FCE Segment: %{y:.2f}<br>Cycle: %{customdata}<extra></extra>"
+            )
+        )
+
+    fig_fce.add_trace(
+        time_series_trace(
+            summary_df['Date'],
+            summary_df['Distance Covered (km)'],
+            CHART_WIDTH,
+            mode='lines+markers',
+            name='Distance Covered (km)',
+            line=dict(color='green', width=2),
+            hovertemplate='Date: %{x}<br>Distance Covered: %{y} km<extra></extra>',
+            yaxis='y2'
+        )
+    )
+
+    fig_fce.update_layout(
+        title="Daily Cumulative FCE with Segmented Cycles and Distance Covered",
+        xaxis_title="Date",
+        yaxis=dict(
+            title='Cumulative FCE',
+            titlefont=dict(color='skyblue'),
+            tickfont=dict(color='skyblue')
+        ),
+        yaxis2=dict(
+            title='Distance Covered (km)',
+            titlefont=dict(color='green'),
+            tickfont=dict(color='green'),
+            overlaying='y',
+            side='right'
+        ),
+        xaxis=dict(
+            tickformat='%Y-%m-%d',
+            tickangle=45
+        ),
+        barmode='stack',
+        hovermode='x unified',
+        template='plotly_white',
+        width=CHART_WIDTH,
+        height=600
+    )
+
+    return fig_fce
+
+
+def day_night_figure(running_hours_df, window=None):
+    """Daytime and nighttime running hours per day."""
+    running_hours_df = in_window(running_hours_df, window, 'Date')
+    if not running_hours_df.empty:
+        bars = bar_buckets(running_hours_df['Date'], CHART_WIDTH)
+        running_hours_df = running_hours_df.groupby(bars)[['Daytime Hours', 'Nighttime Hours']].sum()
+        running_hours_df = running_hours_df.rename_axis('Date').reset_index()
+    fig_day_night = go.Figure()
+    fig_day_night.add_trace(
+        go.Bar(
+            x=running_hours_df['Date'],
+            y=running_hours_df['Daytime Hours'],
+            name='Daytime Running Hours (12 PM - 12 AM)',
+            marker=dict(color='dodgerblue'),
+            hovertemplate=(
+                'Date: %{x}<br>'
+                'Daytime Running Hours: %{y:.2f} hours<extra></extra>'
+            )
+        )
+    )
+
+    fig_day_night.add_trace(
+        go.Bar(
+            x=running_hours_df['Date'],
+            y=running_hours_df['Nighttime Hours'],
+            name='Nighttime Running Hours (12 AM - 12 PM)',
+            marker=dict(color='darkorange'),
+            hovertemplate=(
+                'Date: %{x}<br>'
+                'Nighttime Running Hours: %{y:.2f} hours<extra></extra>'
+            )
+        )
+    )
+
+    fig_day_night.update_layout(
+        title='Daily Running Hours with Daytime and Nighttime Segmentation',
+        xaxis_title='Date',
+        yaxis_title='Running Hours',
+        barmode='stack',
+        xaxis=dict(
+            tickformat='%Y-%m-%d',
+            tickangle=45,
+            showgrid=True
+        ),
+        yaxis=dict(
+            showgrid=True,
+            titlefont=dict(size=12)
+        ),
+        hovermode='x unified',
+        template='plotly_white',
+        width=CHART_WIDTH,
+        height=600
+    )
+
+    return fig_day_night
+
+
+def charging_figure(daily, sessions, window=None):
+    """Daily SOC gained by charging sessions and number of sessions, by session start day."""
+    totals = in_window(daily_session_totals(sessions, daily.index), window)
+    totals = totals.groupby(bar_buckets(totals.index, CHART_WIDTH)).sum()
+    combined_df = pd.DataFrame({
+        'Date': totals.index,
+        'Total Charging Amount (%)': totals['soc_charged'].values,
+        'Charging Events': totals['charging_sessions'].values
+    })
+
+    fig_charging = go.Figure()
+    fig_charging.add_trace(
+        go.Bar(
+            x=combined_df['Date'],
+            y=combined_df['Total Charging Amount (%)'],
+            name='Total Charging Amount (%)',
+            marker=dict(color='mediumseagreen'),
+            hovertemplate='Date: %{x}<br>Total Charging Amount: %{y}%<extra></extra>'
+        )
+    )
+
+    fig_charging.add_trace(
+        time_series_trace(
+            combined_df['Date'],
+            combined_df['Charging Events'],
+            CHART_WIDTH,
+            method='minmax',
+            mode='lines+markers',
+            name='Charging Events',
+            yaxis='y2',
+            marker=dict(color='salmon'),
+            hovertemplate='Date: %{x}<br>Charging Events: %{y}<extra></extra>'
+        )
+    )
+
+    fig_charging.update_layout(
+        title='Daily Charging Events and Total Charging Amount',
+        xaxis_title='Date',
+        yaxis=dict(
+            title='Total Charging Amount (%)',
+            titlefont=dict(color='mediumseagreen'),
+            tickfont=dict(color='mediumseagreen')
+        ),
+        yaxis2=dict(
+            title='Charging Events',
+            titlefont=dict(color='salmon'),
+            tickfont=dict(color='salmon'),
+            overlaying='y',
+            side='right'
+        ),
+        xaxis=dict(tickformat='%Y-%m-%d', tickangle=45),
+        hovermode='x unified',
+        template='plotly_white',
+        width=CHART_WIDTH,
+        height=600
+    )
+
+    return fig_charging
+
+
+def idle_soc_figure(charging, window=None):
+    """SOC gained by each charging session while the vehicle was not running."""
+    charging = in_window(charging, window, 'start')
+    fig_soc_not_running = go.Figure()
+
+    fig_soc_not_running.add_trace(
+        time_series_trace(
+            charging['start'],
+            charging['soc_gained'],
+            CHART_WIDTH,
+            method='minmax',
+            customdata=charging[['duration_hours', 'rate_per_hour']].values,
+            mode='lines+markers',
+            marker=dict(color='blue', size=6),
+            line=dict(color='blue', width=1),
+            name='Positive SOC Change',
+            hovertemplate=(
+                'Start: %{x}<br>SOC Change: %{y:.2f}%<br>'
+                'Duration: %{customdata[0]:.2f} hours<br>Rate: %{customdata[1]:.1f}%/hour<extra></extra>'
+            )
+        )
+    )
+
+    fig_soc_not_running.update_layout(
+        title='Positive SOC Changes While Vehicle is Not Running',
+        xaxis_title='Timestamp',
+        yaxis_title='SOC Change (%)',
+        hovermode='x unified',
+        template='plotly_white',
+        width=CHART_WIDTH,
+        height=600
+    )
+
+    return fig_soc_not_running
+
+
+def moving_average_figure(utilization_df, window=None):
+    """Daily utilization with its 7-day and 30-day moving averages."""
+    utilization_df = in_window(utilization_df, window, 'Date')
+    fig_moving_avg = go.Figure()
+
+    fig_moving_avg.add_trace(
+        time_series_trace(
+            utilization_df['Date'],
+            utilization_df['Daily Utilization (km)'],
+            CHART_WIDTH,
+            mode='lines+markers',
+            name='Daily Utilization',
+            marker=dict(size=4),
+            hovertemplate='Date: %{x}<br>Daily Utilization: %{y} km<extra></extra>'
+        )
+    )
+
+    fig_moving_avg.add_trace(
+        time_series_trace(
+            utilization_df['Date'],
+            utilization_df['7-Day MA'],
+            CHART_WIDTH,
+            mode='lines',
+            name='7-Day Moving Average',
+            line=dict(color='orange', width=2),
+            hovertemplate='Date: %{x}<br>7-Day MA: %{y} km<extra></extra>'
+        )
+    )
+
+    fig_moving_avg.add_trace(
+        time_series_trace(
+            utilization_df['Date'],
+            utilization_df['30-Day MA'],
+            CHART_WIDTH,
+            mode='lines',
+            name='30-Day Moving Average',
+            line=dict(color='green', width=2),
+            hovertemplate='Date: %{x}<br>30-Day MA: %{y} km<extra></extra>'
+        )
+    )
+
+    fig_moving_avg.update_layout(
+        title='Daily Utilization and Moving Averages',
+        xaxis_title='Date',
+        yaxis_title='Utilization (km)',
+        hovermode='x unified',
+        template='plotly_white',
+        width=CHART_WIDTH,
+        height=600
+    )
+
+    return fig_moving_avg
+
+
+def comparison_figure(series, title, yaxis_title, window=None):
+    """One line per vehicle of a date-indexed frame with a column per chassis."""
+    series = in_window(series, window)
+    fig_comparison = go.Figure()
+
+    for chassis_number in series.columns:
+        fig_comparison.add_trace(
+            time_series_trace(
+                series.index,
+                series[chassis_number],
+                CHART_WIDTH,
+                mode='lines+markers',
+                marker=dict(size=4),
+                name=str(chassis_number),
+                hovertemplate=f'{chassis_number}: %{{y:.2f}}<extra></extra>'
+            )
+        )
+
+    fig_comparison.update_layout(
+        title=title,
+        xaxis_title='Date',
+        yaxis_title=yaxis_title,
+        hovermode='x unified',
+        template='plotly_white',
+        width=CHART_WIDTH,
+        height=600
+    )
+
+    return fig_comparison
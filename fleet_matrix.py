@@ -0,0 +1,143 @@
+"""Fleet-relative daily metrics on dense vehicles x days matrices.
+
+FleetMatrix holds one float64 matrix per metric with a row per vehicle and
+a column per calendar day, plus a boolean mask of the days each vehicle
+reported; unreported cells are NaN. Every statistic below is a whole-matrix
+NumPy operation, looped at most over OEMs:
+
+    cohort_percentiles  per-OEM percentiles of each day across vehicles
+    percentile_ranks    each vehicle's mean within its OEM cohort, 0-100
+    rolling_zscores     each day against the vehicle's own trailing window
+    anomaly_flags       -1 / 0 / +1 where a z-score passes the threshold
+    fleet_summary       one row per vehicle combining the above
+
+Trailing windows exclude the current day, so an outlier does not pull its
+own baseline towards itself.
+"""
+from dataclasses import dataclass
+
+import numpy as np
+import pandas as pd
+
+DEFAULT_METRICS = ('distance', 'fce', 'soc_charge')
+DEFAULT_PERCENTILES = (10, 25, 50, 75, 90)
+DEFAULT_WINDOW = 30
+DEFAULT_MIN_PERIODS = 7
+ANOMALY_THRESHOLD = 3.0
+
+
+@dataclass
+class FleetMatrix:
+    chassis_numbers: pd.Index
+    oems: np.ndarray
+    days: pd.DatetimeIndex
+    values: dict
+    mask: np.ndarray
+
+    @classmethod
+    def from_long(cls, frame, metrics=DEFAULT_METRICS):
+        """Matrices from one row per vehicle-day with oem, chassis_number, date and the metric columns."""
+        vehicle, chassis_numbers = pd.factorize(frame['chassis_number'])
+        dates = pd.DatetimeIndex(pd.to_datetime(frame['date'])).normalize()
+        days = pd.date_range(dates.min(), dates.max(), freq='D') if len(dates) else pd.DatetimeIndex([])
+        day = (dates - days[0]).days.values if len(dates) else np.empty(0, dtype=int)
+
+        oems = np.empty(len(chassis_numbers), dtype=object)
+        oems[vehicle] = frame['oem'].values
+        mask = np.zeros((len(chassis_numbers), len(days)), dtype=bool)
+        mask[vehicle, day] = True
+        values = {}
+        for metric in metrics:
+            matrix = np.full(mask.shape, np.nan)
+            matrix[vehicle, day] = frame[metric].values
+            values[metric] = matrix
+        return cls(pd.Index(chassis_numbers, name='chassis_number'), oems, days, values, mask)
+
+
+def cohort_percentiles(fleet, metric, percentiles=DEFAULT_PERCENTILES):
+    """{oem: array of shape (len(percentiles), days)} over the vehicles that reported each day."""
+    values = fleet.values[metric]
+    return {oem: _column_percentiles(values[fleet.oems == oem], percentiles) for oem in np.unique(fleet.oems)}
+
+
+def percentile_ranks(fleet, metric):
+    """Share of OEM peers with a lower mean daily value, in percent (NaN without peers or data)."""
+    means = pd.Series(_row_means(fleet.values[metric], fleet.mask))
+    by_oem = means.groupby(fleet.oems)
+    below = by_oem.rank(method='min') - 1
+    peers = by_oem.transform('count') - 1
+    return (below / peers.where(peers > 0) * 100).values
+
+
+def rolling_zscores(fleet, metric, window=DEFAULT_WINDOW, min_periods=DEFAULT_MIN_PERIODS):
+    """(value - mean) / std of the vehicle's reported days in the `window` days before each day."""
+    values = fleet.values[metric]
+    observed = fleet.mask & ~np.isnan(values)
+    x = np.where(observed, values, 0.0)
+
+    count = _trailing_sums(observed.astype(float), window)
+    total = _trailing_sums(x, window)
+    squares = _trailing_sums(x * x, window)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        mean = total / count
+        std = np.sqrt(np.maximum((squares - count * mean * mean) / (count - 1), 0))
+        z = (values - mean) / std
+    return np.where(observed & (count >= min_periods) & (std > 0), z, np.nan)
+
+
+def anomaly_flags(zscores, threshold=ANOMALY_THRESHOLD):
+    """+1 where a z-score is at least `threshold`, -1 where it is at most -threshold, else 0."""
+    with np.errstate(invalid='ignore'):
+        return np.where(zscores >= threshold, 1, np.where(zscores <= -threshold, -1, 0)).astype(np.int8)
+
+
+def fleet_summary(fleet, metric='distance', window=DEFAULT_WINDOW, threshold=ANOMALY_THRESHOLD):
+    """One row per vehicle: OEM cohort rank, days below/above the cohort's daily p25/p75 and anomaly days."""
+    values = fleet.values[metric]
+    quartiles = np.full((2,) + values.shape, np.nan)
+    for oem, bands in cohort_percentiles(fleet, metric, (25, 75)).items():
+        quartiles[:, fleet.oems == oem] = bands[:, None, :]
+    flags = anomaly_flags(rolling_zscores(fleet, metric, window), threshold)
+    oems = pd.Series(fleet.oems)
+
+    with np.errstate(invalid='ignore'):
+        return pd.DataFrame({
+            'oem': fleet.oems,
+            'days': fleet.mask.sum(axis=1),
+            'mean': _row_means(values, fleet.mask),
+            'percentile_rank': percentile_ranks(fleet, metric),
+            'cohort_size': oems.map(oems.value_counts()).values,
+            'days_below_p25': (fleet.mask & (values < quartiles[0])).sum(axis=1),
+            'days_above_p75': (fleet.mask & (values > quartiles[1])).sum(axis=1),
+            'low_anomalies': (flags < 0).sum(axis=1),
+            'high_anomalies': (flags > 0).sum(axis=1)
+        }, index=fleet.chassis_numbers)
+
+
+def _row_means(values, mask):
+    observed = mask & ~np.isnan(values)
+    count = observed.sum(axis=1)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        return np.where(observed, values, 0.0).sum(axis=1) / np.where(count > 0, count, np.nan)
+
+
+def _column_percentiles(values, percentiles):
+    """Linear-interpolated percentiles of each column over its non-NaN rows."""
+    ordered = np.sort(values, axis=0)
+    count = (~np.isnan(values)).sum(axis=0)
+    rank = np.asarray(percentiles, dtype=float)[:, None] / 100 * np.maximum(count - 1, 0)
+    lower = np.floor(rank).astype(int)
+    upper = np.ceil(rank).astype(int)
+    low = np.take_along_axis(ordered, lower, axis=0)
+    high = np.take_along_axis(ordered, upper, axis=0)
+    result = low + (high - low) * (rank - lower)
+    result[:, count == 0] = np.nan
+    return result
+
+
+def _trailing_sums(x, window):
+    """Sum of each row over the `window` columns before each column, excluding the column itself."""
+    cumulative = np.zeros((x.shape[0], x.shape[1] + 1))
+    np.cumsum(x, axis=1, out=cumulative[:, 1:])
+    end = np.arange(x.shape[1])
+    return cumulative[:, end] - cumulative[:, np.maximum(end - window, 0)]
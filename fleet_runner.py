@@ -0,0 +1,211 @@
+"""Headless batch runner computing dashboard metrics for many vehicles.
+
+    python fleet_runner.py vehicles.csv --output fleet_metrics.parquet --workers 8
+
+`vehicles.csv` has the columns oem, chassis_number, start_date, end_date.
+Vehicles are grouped into chunks and the chunks run on a process pool with
+a bounded number in flight. Each vehicle gets one row in the output
+Parquet file; failures, including chunks whose worker process died, are
+recorded in its `error` column instead of stopping the run. With
+--rollup-store each vehicle's completed days are also folded into a
+RollupStore, which the dashboard's fleet ranking reads.
+"""
+import argparse
+import os
+import sys
+import time
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from concurrent.futures.process import BrokenProcessPool
+
+import pandas as pd
+
+from pipeline import analyze_vehicle, vehicle_metrics
+from schema import normalize_telemetry
+
+DEFAULT_CHUNK_SIZE = 16
+
+
+def make_fetch(csv_path=None, cache_dir=None):
+    if csv_path:
+        from telemetry_cache import csv_fetcher
+        fetch = csv_fetcher(csv_path)
+    else:
+        from warehouse import fetch_telemetry
+        fetch = fetch_telemetry
+
+    if cache_dir:
+        from telemetry_cache import TelemetryCache
+        fetch = TelemetryCache(cache_dir, fetch).load
+    return fetch
+
+
+def run_vehicle(fetch, oem, chassis_number, start_date, end_date, store=None):
+    start = pd.to_datetime(start_date).strftime('%Y-%m-%d %H:%M:%S')
+    end = pd.to_datetime(end_date).strftime('%Y-%m-%d %H:%M:%S')
+    df = fetch(oem, chassis_number, start, end)
+    if df.empty:
+        raise ValueError("no data for the selected chassis number and date range")
+    df = normalize_telemetry(df)
+
+    analysis = analyze_vehicle(df, chassis_number, start_date, end_date)
+    if analysis.insights is None:
+        raise ValueError("no data left after filtering")
+    if store is not None:
+        # Fold in the days the loaded packets cover completely, without fetching them again
+        store.refresh(oem, chassis_number, loaded_fetch(df, start, end, fetch), start,
+                      pd.Timestamp(end) + pd.Timedelta(seconds=1))
+    return vehicle_metrics(analysis.daily, analysis.insights)
+
+
+def loaded_fetch(df, start, end, fetch):
+    """Fetch function serving ranges inside [start, end] from the frame already loaded, others from `fetch`."""
+    def fetch_loaded(oem, chassis_number, start_date, end_date):
+        if pd.Timestamp(start) <= pd.Timestamp(start_date) and pd.Timestamp(end_date) <= pd.Timestamp(end):
+            return df
+        return fetch(oem, chassis_number, start_date, end_date)
+    return fetch_loaded
+
+
+def run_vehicle_pushdown(oem, chassis_number, start_date, end_date):
+    from insights import generate_dynamic_insights
+    from warehouse import load_daily_rollup_from_bigquery, load_odometer_bounds_from_bigquery
+
+    # The same IQR cleaning as the raw path, with quartiles computed in the warehouse
+    bounds = load_odometer_bounds_from_bigquery(oem, chassis_number, start_date, end_date)
+    if bounds is None:
+        raise ValueError("no data for the selected chassis number and date range")
+    daily = load_daily_rollup_from_bigquery(oem, chassis_number, start_date, end_date, odometer_bounds=bounds)
+    if daily.empty:
+        raise ValueError("no data for the selected chassis number and date range")
+    return vehicle_metrics(daily, generate_dynamic_insights(daily))
+
+
+def run_chunk(vehicles, csv_path=None, cache_dir=None, pushdown=False, rollup_store=None):
+    try:
+        fetch = None if pushdown else make_fetch(csv_path, cache_dir)
+        store = None
+        if rollup_store:
+            from rollup_store import RollupStore
+            store = RollupStore(rollup_store)
+    except Exception as e:
+        return failed_records(vehicles, e)
+
+    records = []
+    for oem, chassis_number, start_date, end_date in vehicles:
+        record = {'oem': oem, 'chassis_number': chassis_number, 'start_date': start_date, 'end_date': end_date}
+        started = time.perf_counter()
+        try:
+            if pushdown:
+                record.update(run_vehicle_pushdown(oem, chassis_number, start_date, end_date))
+            else:
+                record.update(run_vehicle(fetch, oem, chassis_number, start_date, end_date, store))
+            record['error'] = None
+        except Exception as e:
+            record['error'] = f"{type(e).__name__}: {e}"
+        record['seconds'] = time.perf_counter() - started
+        records.append(record)
+    return records
+
+
+def failed_records(vehicles, error):
+    """One record per vehicle of a chunk that could not run at all."""
+    return [
+        {'oem': oem, 'chassis_number': chassis_number, 'start_date': start_date, 'end_date': end_date,
+         'error': f"{type(error).__name__}: {error}", 'seconds': 0.0}
+        for oem, chassis_number, start_date, end_date in vehicles
+    ]
+
+
+def run_fleet(vehicles, workers=None, chunk_size=DEFAULT_CHUNK_SIZE, csv_path=None, cache_dir=None, pushdown=False,
+              rollup_store=None, progress=None):
+    """Fan (oem, chassis_number, start_date, end_date) tuples out over a process pool.
+
+    A worker that dies (BrokenProcessPool) takes the pool and every chunk
+    in flight with it. Those chunks are rerun one at a time on a fresh
+    pool, so only the chunk that kills a worker on its own is recorded as
+    failed, for each of its vehicles, and the run continues.
+    """
+    workers = workers or os.cpu_count() or 1
+    chunks = [vehicles[i:i + chunk_size] for i in range(0, len(vehicles), chunk_size)]
+    max_in_flight = workers * 2
+    records = []
+    done_vehicles = 0
+
+    executor = ProcessPoolExecutor(max_workers=workers)
+    try:
+        pending = {}
+        remaining = iter(chunks)
+        retries = []
+        while True:
+            if retries:
+                if not pending:
+                    chunk = retries.pop(0)
+                    future = executor.submit(run_chunk, chunk, csv_path, cache_dir, pushdown, rollup_store)
+                    pending[future] = (chunk, executor, True)
+            else:
+                for chunk in remaining:
+                    future = executor.submit(run_chunk, chunk, csv_path, cache_dir, pushdown, rollup_store)
+                    pending[future] = (chunk, executor, False)
+                    if len(pending) >= max_in_flight:
+                        break
+            if not pending:
+                break
+
+            finished, _ = wait(pending, return_when=FIRST_COMPLETED)
+            for future in finished:
+                chunk, pool, retried = pending.pop(future)
+                try:
+                    chunk_records = future.result()
+                except BrokenProcessPool as e:
+                    if pool is executor:
+                        executor.shutdown(wait=False)
+                        executor = ProcessPoolExecutor(max_workers=workers)
+                    if not retried:
+                        retries.append(chunk)
+                        continue
+                    chunk_records = failed_records(chunk, e)
+                except Exception as e:
+                    chunk_records = failed_records(chunk, e)
+                records.extend(chunk_records)
+                done_vehicles += len(chunk_records)
+                if progress:
+                    failures = sum(record['error'] is not None for record in records)
+                    progress(done_vehicles, len(vehicles), failures)
+    finally:
+        executor.shutdown()
+
+    return pd.DataFrame.from_records(records)
+
+
+def print_progress(done, total, failures):
+    print(f"[{done}/{total}] vehicles processed, {failures} failed", file=sys.stderr)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compute dashboard metrics for a list of vehicles")
+    parser.add_argument("vehicles", help="CSV with columns oem, chassis_number, start_date, end_date")
+    parser.add_argument("--output", default="fleet_metrics.parquet", help="Parquet file to write")
+    parser.add_argument("--workers", type=int, default=None, help="worker processes (default: CPU count)")
+    parser.add_argument("--chunk-size", type=int, default=DEFAULT_CHUNK_SIZE, help="vehicles per work unit")
+    parser.add_argument("--csv", help="read telemetry from this CSV export instead of BigQuery")
+    parser.add_argument("--cache-dir", help="serve telemetry through a TelemetryCache in this directory")
+    parser.add_argument("--pushdown", action="store_true",
+                        help="compute daily rollups inside BigQuery instead of fetching raw packets")
+    parser.add_argument("--rollup-store", help="also fold each vehicle's completed days into this RollupStore")
+    args = parser.parse_args()
+    if args.pushdown and args.rollup_store:
+        parser.error("--rollup-store needs raw packets and cannot be combined with --pushdown")
+
+    vehicle_list = pd.read_csv(args.vehicles, dtype=str)
+    vehicles = list(vehicle_list[['oem', 'chassis_number', 'start_date', 'end_date']].itertuples(index=False, name=None))
+
+    results = run_fleet(vehicles, args.workers, args.chunk_size, args.csv, args.cache_dir, args.pushdown,
+                        args.rollup_store, progress=print_progress)
+    results.to_parquet(args.output, index=False)
+
+    failures = results['error'].notna().sum() if not results.empty else 0
+    print(f"Wrote {len(results)} vehicles to {args.output} ({failures} failed)", file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,99 @@
+from sessions import daily_session_totals
+
+HIGH_UTILIZATION_FACTOR = 1.5
+LOW_UTILIZATION_FACTOR = 0.5
+DEEP_DISCHARGE_SOC = 20
+LONG_IDLE_SHARE = 0.9
+TREND_WINDOW_DAYS = 7
+
+
+def generate_dynamic_insights(daily, sessions=None):
+    """Headline metrics for one vehicle, read from its DailyRollup table and session tables.
+
+    Charging and idle metrics come from `sessions` (see sessions.py). When
+    only the daily table is available, as with SQL pushdown, they fall back
+    to the per-sample SOC rises and key-off sample share of the rollup.
+    """
+    distance = daily['distance']
+    avg_daily_distance = distance.mean()
+
+    if sessions is not None:
+        totals = daily_session_totals(sessions, daily.index)
+        charging_per_day = totals['soc_charged']
+        long_idle = totals['trip_hours'] <= (1 - LONG_IDLE_SHARE) * 24
+        session_counts = {
+            'trip_count': len(sessions.trips),
+            'charging_sessions': len(sessions.charging),
+            'avg_charge_rate': sessions.charging['rate_per_hour'].mean() if not sessions.charging.empty else 0.0
+        }
+    else:
+        charging_per_day = daily['soc_charge']
+        long_idle = daily['key_off_samples'] / daily['samples'] >= LONG_IDLE_SHARE
+        session_counts = {}
+
+    return {
+        'avg_daily_distance': avg_daily_distance,
+        'total_distance': distance.sum(),
+        'max_distance_day': distance.idxmax().date(),
+        'min_distance_day': distance.idxmin().date(),
+        'high_util_days': int((distance > HIGH_UTILIZATION_FACTOR * avg_daily_distance).sum()),
+        'low_util_days': int((distance < LOW_UTILIZATION_FACTOR * avg_daily_distance).sum()),
+        'deep_discharge_count': int((daily['soc_min'] < DEEP_DISCHARGE_SOC).sum()),
+        'avg_charging_per_day': charging_per_day.mean(),
+        'long_idle_days': int(long_idle.sum()),
+        **session_counts
+    }
+
+
+def generate_narrative_insights(insights, daily_distance, charging_events, idle_periods):
+    """Plain-language observations built from the headline metrics and per-day series."""
+    narrative = []
+    days = len(daily_distance)
+
+    narrative.append(
+        f"The vehicle covered {insights['total_distance']:.0f} km over {days} days, "
+        f"averaging {insights['avg_daily_distance']:.1f} km per day."
+    )
+
+    if days > TREND_WINDOW_DAYS and insights['avg_daily_distance'] > 0:
+        recent = daily_distance.iloc[-TREND_WINDOW_DAYS:].mean()
+        change = (recent - insights['avg_daily_distance']) / insights['avg_daily_distance'] * 100
+        if abs(change) >= 10:
+            direction = "up" if change > 0 else "down"
+            narrative.append(
+                f"Usage in the last {TREND_WINDOW_DAYS} days is {direction} {abs(change):.0f}% "
+                f"against the period average."
+            )
+
+    if insights['low_util_days'] > insights['high_util_days']:
+        narrative.append(
+            f"Low-utilization days ({insights['low_util_days']}) outnumber high-utilization days "
+            f"({insights['high_util_days']}); check in with the customer about demand or vehicle issues."
+        )
+    elif insights['high_util_days'] > 0:
+        narrative.append(
+            f"The vehicle had {insights['high_util_days']} high-utilization days, "
+            f"showing strong earning potential."
+        )
+
+    if insights['deep_discharge_count'] > 0:
+        narrative.append(
+            f"The battery dropped below {DEEP_DISCHARGE_SOC}% SOC on {insights['deep_discharge_count']} days. "
+            f"Advise the driver to charge earlier to protect battery health."
+        )
+
+    charging_days = int((charging_events > 0).sum())
+    if 'charging_sessions' in insights:
+        narrative.append(
+            f"The vehicle charged {insights['charging_sessions']} times, on {charging_days} of {days} days."
+        )
+    else:
+        narrative.append(f"The SOC ended higher than it started on {charging_days} of {days} days.")
+
+    if insights['long_idle_days'] > 0 and len(idle_periods) > 0:
+        narrative.append(
+            f"The vehicle stood idle for most of the day on {insights['long_idle_days']} days; "
+            f"the longest idle day was {idle_periods.idxmax().date()}."
+        )
+
+    return narrative
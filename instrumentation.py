@@ -0,0 +1,221 @@
+"""Per-stage timing and memory instrumentation.
+
+A StageRecorder wraps named stages of one request:
+
+    recorder = StageRecorder(enabled=True)
+    with recorder.stage('fetch') as stage:
+        df = fetch(...)
+        stage['rows'] = len(df)
+
+Each stage records wall time, CPU time, an optional row count and, when
+memory tracing is on, the tracemalloc peak reached inside the stage above
+what was already allocated when it started.
+Finished stages are also added to a process-wide registry, so latency
+percentiles can be exported across all sessions of the server process as
+JSON lines or Prometheus text. A disabled recorder hands out a shared
+no-op context manager and records nothing.
+
+tracemalloc is process-wide: while it runs every allocation in the
+process is slower, and concurrent sessions share the peak counter.
+Recorders that trace memory hold a reference on tracing, and it is
+stopped when the last of them is closed (or garbage collected), unless
+something else had already started it. Without tracemalloc.reset_peak
+(Python 3.8) the peak is the highest point since tracing began.
+"""
+import functools
+import json
+import os
+import threading
+import time
+import tracemalloc
+import weakref
+from collections import defaultdict, deque
+
+import numpy as np
+
+MAX_SAMPLES_PER_STAGE = 5000
+PROMETHEUS_QUANTILES = (0.5, 0.95, 0.99)
+
+_tracing_lock = threading.Lock()
+_tracing_users = 0
+_tracing_started = False
+
+
+def _acquire_tracing():
+    global _tracing_users, _tracing_started
+    with _tracing_lock:
+        if _tracing_users == 0 and not tracemalloc.is_tracing():
+            tracemalloc.start()
+            _tracing_started = True
+        _tracing_users += 1
+
+
+def _release_tracing():
+    global _tracing_users, _tracing_started
+    with _tracing_lock:
+        _tracing_users -= 1
+        if _tracing_users == 0 and _tracing_started:
+            tracemalloc.stop()
+            _tracing_started = False
+
+
+class _NullStage:
+    def __enter__(self):
+        return {}
+
+    def __exit__(self, *exc_info):
+        return False
+
+
+_NULL_STAGE = _NullStage()
+
+
+class _Stage:
+    def __init__(self, recorder, name, rows):
+        self.recorder = recorder
+        self.record = {'stage': name, 'rows': rows}
+
+    def __enter__(self):
+        if self.recorder.trace_memory:
+            if hasattr(tracemalloc, 'reset_peak'):
+                tracemalloc.reset_peak()
+            self._traced = tracemalloc.get_traced_memory()[0]
+        self._wall = time.perf_counter()
+        self._cpu = time.process_time()
+        return self.record
+
+    def __exit__(self, exc_type, exc, traceback):
+        self.record['wall_seconds'] = time.perf_counter() - self._wall
+        self.record['cpu_seconds'] = time.process_time() - self._cpu
+        self.record['peak_bytes'] = tracemalloc.get_traced_memory()[1] - self._traced if self.recorder.trace_memory else None
+        self.record['failed'] = exc_type is not None
+        self.record['timestamp'] = time.time()
+        self.recorder._finish(self.record)
+        return False
+
+
+class StageRecorder:
+    def __init__(self, enabled=True, trace_memory=True, registry=None):
+        self.enabled = enabled
+        self.trace_memory = enabled and trace_memory
+        self.registry = REGISTRY if registry is None else registry
+        self.records = []
+        self._release = None
+        if self.trace_memory:
+            _acquire_tracing()
+            self._release = weakref.finalize(self, _release_tracing)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+        return False
+
+    def close(self):
+        """Stop tracing memory for this recorder; tracing ends once no open recorder needs it."""
+        self.trace_memory = False
+        if self._release is not None:
+            self._release()
+
+    def stage(self, name, rows=None):
+        if not self.enabled:
+            return _NULL_STAGE
+        return _Stage(self, name, rows)
+
+    def timed(self, name):
+        """Decorator form of stage()."""
+        def decorator(fn):
+            @functools.wraps(fn)
+            def wrapper(*args, **kwargs):
+                with self.stage(name):
+                    return fn(*args, **kwargs)
+            return wrapper
+        return decorator
+
+    def to_json_lines(self):
+        return "".join(json.dumps(record) + "\n" for record in self.records)
+
+    def _finish(self, record):
+        self.records.append(record)
+        self.registry.add(record)
+
+
+class MetricsRegistry:
+    """Thread-safe store of recent stage records shared by every session in the process."""
+
+    def __init__(self, max_samples=MAX_SAMPLES_PER_STAGE, log_path=None):
+        self._lock = threading.Lock()
+        self._records = defaultdict(lambda: deque(maxlen=max_samples))
+        self._counts = defaultdict(int)
+        self._sums = defaultdict(float)
+        self.log_path = log_path
+
+    def add(self, record):
+        with self._lock:
+            self._records[record['stage']].append(record)
+            self._counts[record['stage']] += 1
+            self._sums[record['stage']] += record['wall_seconds']
+            if self.log_path:
+                with open(self.log_path, "a") as f:
+                    f.write(json.dumps(record) + "\n")
+
+    def summary(self):
+        """Per-stage count and wall-time percentiles over the retained samples."""
+        with self._lock:
+            stages = {stage: list(records) for stage, records in self._records.items()}
+        summary = {}
+        for stage, records in stages.items():
+            wall = np.array([record['wall_seconds'] for record in records])
+            peaks = [record['peak_bytes'] for record in records if record['peak_bytes'] is not None]
+            summary[stage] = {
+                'count': self._counts[stage],
+                'p50_seconds': float(np.quantile(wall, 0.5)),
+                'p95_seconds': float(np.quantile(wall, 0.95)),
+                'max_peak_bytes': max(peaks) if peaks else None
+            }
+        return summary
+
+    def to_json_lines(self):
+        with self._lock:
+            records = [record for records in self._records.values() for record in records]
+        return "".join(json.dumps(record) + "\n" for record in sorted(records, key=lambda r: r['timestamp']))
+
+    def prometheus_text(self):
+        with self._lock:
+            stages = {stage: list(records) for stage, records in self._records.items()}
+            counts = dict(self._counts)
+            sums = dict(self._sums)
+
+        lines = [
+            "# HELP vehicle_analytics_stage_seconds Wall time of dashboard stages.",
+            "# TYPE vehicle_analytics_stage_seconds summary"
+        ]
+        for stage, records in sorted(stages.items()):
+            wall = np.array([record['wall_seconds'] for record in records])
+            for q in PROMETHEUS_QUANTILES:
+                lines.append(f'vehicle_analytics_stage_seconds{{stage="{stage}",quantile="{q}"}} {np.quantile(wall, q):.6f}')
+            lines.append(f'vehicle_analytics_stage_seconds_sum{{stage="{stage}"}} {sums[stage]:.6f}')
+            lines.append(f'vehicle_analytics_stage_seconds_count{{stage="{stage}"}} {counts[stage]}')
+
+        lines += [
+            "# HELP vehicle_analytics_stage_cpu_seconds_total CPU time spent in dashboard stages.",
+            "# TYPE vehicle_analytics_stage_cpu_seconds_total counter"
+        ]
+        for stage, records in sorted(stages.items()):
+            cpu = sum(record['cpu_seconds'] for record in records)
+            lines.append(f'vehicle_analytics_stage_cpu_seconds_total{{stage="{stage}"}} {cpu:.6f}')
+
+        lines += [
+            "# HELP vehicle_analytics_stage_peak_bytes Largest tracemalloc peak seen in a stage.",
+            "# TYPE vehicle_analytics_stage_peak_bytes gauge"
+        ]
+        for stage, records in sorted(stages.items()):
+            peaks = [record['peak_bytes'] for record in records if record['peak_bytes'] is not None]
+            if peaks:
+                lines.append(f'vehicle_analytics_stage_peak_bytes{{stage="{stage}"}} {max(peaks)}')
+        return "\n".join(lines) + "\n"
+
+
+REGISTRY = MetricsRegistry(log_path=os.environ.get("PERF_METRICS_LOG"))
+DISABLED = StageRecorder(enabled=False)
@@ -0,0 +1,245 @@
+"""In-process memoization of dashboard results, shared by all sessions.
+
+ResultCache keeps four layers:
+
+    raw      fetched telemetry              key: query parameters
+    clean    filtered and cleaned rows      key: query parameters + raw fingerprint
+    daily    rollup, sessions, insights     key: query parameters + clean fingerprint
+    figures  Plotly figures and chart data  key: query parameters + name + upstream fingerprint
+
+Every key also carries CODE_VERSION, a hash of the source of the
+dashboard's analysis and figure modules and every local module they
+import, so a deploy never serves results computed by older code. The
+fingerprint is a hash of the upstream frame's contents, so a layer can
+only return what its inputs would produce now.
+
+Each layer is an LRU bounded by an estimate of its entries' memory, with
+an optional time-to-live. The raw layer expires by default because the
+most recent days are still receiving packets. A request whose date range
+lies inside a cached raw range is served by slicing that frame instead of
+fetching again. Raw frames are stored in the compact layout of
+schema.normalize_telemetry.
+
+Cached values are shared between sessions and must not be modified.
+"""
+import ast
+import dataclasses
+import hashlib
+import importlib.util
+import os
+import sys
+import threading
+import time
+from collections import OrderedDict
+
+import numpy as np
+import pandas as pd
+
+from instrumentation import DISABLED
+from pipeline import VehicleAnalysis, prepare_vehicle, summarize_vehicle
+from schema import date_slice, normalize_telemetry
+
+CODE_ROOTS = ('pipeline', 'figures', 'running_hours', 'memo')
+MB = 1024 ** 2
+DEFAULT_RAW_TTL = 15 * 60
+
+
+def local_modules(roots=CODE_ROOTS):
+    """The root modules and every module of this directory they import, directly or indirectly."""
+    directory = os.path.dirname(os.path.abspath(__file__))
+    found = set()
+    pending = list(roots)
+    while pending:
+        name = pending.pop()
+        path = os.path.join(directory, f"{name}.py")
+        if name in found or not os.path.exists(path):
+            continue
+        found.add(name)
+        with open(path, encoding='utf-8') as f:
+            tree = ast.parse(f.read())
+        for node in ast.walk(tree):
+            if isinstance(node, ast.Import):
+                pending.extend(alias.name.split('.')[0] for alias in node.names)
+            elif isinstance(node, ast.ImportFrom) and node.module and not node.level:
+                pending.append(node.module.split('.')[0])
+    return tuple(sorted(found))
+
+
+CODE_MODULES = local_modules()
+
+
+def code_version(modules=CODE_MODULES):
+    digest = hashlib.blake2b(digest_size=8)
+    for name in modules:
+        spec = importlib.util.find_spec(name)
+        if spec is not None and spec.origin:
+            with open(spec.origin, 'rb') as f:
+                digest.update(f.read())
+    return digest.hexdigest()
+
+
+CODE_VERSION = code_version()
+
+
+def fingerprint(df):
+    """Content hash of a DataFrame's columns and values (the index is ignored)."""
+    digest = hashlib.blake2b(repr(list(df.columns)).encode(), digest_size=16)
+    if not df.empty:
+        digest.update(pd.util.hash_pandas_object(df, index=False).values.tobytes())
+    return digest.hexdigest()
+
+
+def sizeof(value):
+    """Rough memory footprint of a cached value in bytes."""
+    if isinstance(value, pd.DataFrame):
+        return int(value.memory_usage(index=True, deep=True).sum())
+    if isinstance(value, (pd.Series, pd.Index)):
+        return int(value.memory_usage(deep=True))
+    if isinstance(value, np.ndarray):
+        return value.nbytes
+    if isinstance(value, (tuple, list)):
+        return sys.getsizeof(value) + sum(sizeof(item) for item in value)
+    if isinstance(value, dict):
+        return sys.getsizeof(value) + sum(sizeof(item) for item in value.values())
+    if dataclasses.is_dataclass(value):
+        return sizeof(dataclasses.astuple(value))
+    if hasattr(value, 'to_plotly_json'):
+        return sizeof(value.to_plotly_json())
+    return sys.getsizeof(value)
+
+
+class MemoLayer:
+    """Thread-safe LRU of values bounded by total estimated bytes and optional TTL in seconds."""
+
+    def __init__(self, name, max_bytes, ttl=None):
+        self.name = name
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and self._expired(entry):
+                self._remove(key)
+                entry = None
+            if entry is None:
+                self.misses += 1
+                return None
+            self.hits += 1
+            self._entries.move_to_end(key)
+            return entry[0]
+
+    def put(self, key, value):
+        size = sizeof(value)
+        if size > self.max_bytes:
+            return value
+        with self._lock:
+            if key in self._entries:
+                self._remove(key)
+            self._entries[key] = (value, size, time.monotonic())
+            self._bytes += size
+            while self._bytes > self.max_bytes:
+                self._remove(next(iter(self._entries)))
+        return value
+
+    def items(self):
+        """Live (key, value) pairs, most recently used last."""
+        with self._lock:
+            return [(key, entry[0]) for key, entry in self._entries.items() if not self._expired(entry)]
+
+    def discard(self, predicate):
+        with self._lock:
+            for key in [key for key in self._entries if predicate(key)]:
+                self._remove(key)
+
+    def stats(self):
+        with self._lock:
+            return {'layer': self.name, 'entries': len(self._entries), 'mb': self._bytes / MB,
+                    'hits': self.hits, 'misses': self.misses}
+
+    def _expired(self, entry):
+        return self.ttl is not None and time.monotonic() - entry[2] > self.ttl
+
+    def _remove(self, key):
+        _, size, _ = self._entries.pop(key)
+        self._bytes -= size
+
+
+class ResultCache:
+    """Memoized fetch, cleaning, rollup and figures for the dashboard.
+
+    `fetch` has the signature of `warehouse.fetch_telemetry`. Concurrent
+    misses on the same key may both compute; the last result wins.
+    """
+
+    def __init__(self, fetch, raw_mb=1024, clean_mb=512, daily_mb=64, figures_mb=256, raw_ttl=DEFAULT_RAW_TTL):
+        self.fetch = fetch
+        self.raw = MemoLayer('raw', raw_mb * MB, raw_ttl)
+        self.clean = MemoLayer('clean', clean_mb * MB)
+        self.daily = MemoLayer('daily', daily_mb * MB)
+        self.figures = MemoLayer('figures', figures_mb * MB)
+
+    def load(self, oem, chassis_number, start_date, end_date):
+        """Raw telemetry and its fingerprint, from an exact or covering cached range if possible."""
+        start, end = pd.Timestamp(start_date), pd.Timestamp(end_date)
+        key = ('raw', oem, chassis_number, start, end, CODE_VERSION)
+        cached = self.raw.get(key)
+        if cached is not None:
+            return cached
+
+        for (_, cached_oem, cached_chassis, cached_start, cached_end, version), (df, raw_fp) in self.raw.items():
+            if (cached_oem, cached_chassis, version) == (oem, chassis_number, CODE_VERSION) and \
+                    cached_start <= start and end <= cached_end:
+                sliced_fp = hashlib.blake2b(f"{raw_fp}|{start}|{end}".encode(), digest_size=16).hexdigest()
+                return date_slice(df, start, end), sliced_fp
+
+        df = self.fetch(oem, chassis_number, start.strftime('%Y-%m-%d %H:%M:%S'), end.strftime('%Y-%m-%d %H:%M:%S'))
+        if not df.empty:
+            df = normalize_telemetry(df)
+        return self.raw.put(key, (df, fingerprint(df)))
+
+    def analysis(self, oem, chassis_number, start_date, end_date, recorder=DISABLED):
+        """VehicleAnalysis for the request plus the clean and daily fingerprints for figure keys."""
+        params = (oem, chassis_number, pd.Timestamp(start_date), pd.Timestamp(end_date), CODE_VERSION)
+        with recorder.stage('fetch') as stage:
+            df, raw_fp = self.load(oem, chassis_number, start_date, end_date)
+            stage['rows'] = len(df)
+
+        clean_key = params + (raw_fp,)
+        prepared = self.clean.get(clean_key)
+        if prepared is None:
+            df_filtered, vehicle_date_range, df_clean = prepare_vehicle(df, chassis_number, start_date, end_date, recorder)
+            prepared = self.clean.put(clean_key, (df_filtered, vehicle_date_range, df_clean, fingerprint(df_clean)))
+        df_filtered, vehicle_date_range, df_clean, clean_fp = prepared
+
+        daily_key = params + (clean_fp,)
+        summary = self.daily.get(daily_key)
+        if summary is None:
+            daily, sessions, insights = summarize_vehicle(df_clean, recorder)
+            summary = self.daily.put(daily_key, (daily, sessions, insights, fingerprint(daily)))
+        daily, sessions, insights, daily_fp = summary
+
+        analysis = VehicleAnalysis(chassis_number, vehicle_date_range, df_filtered, df_clean, daily, sessions, insights)
+        return analysis, clean_fp, daily_fp
+
+    def chart(self, name, params, upstream_fingerprint, build):
+        """Memoized build() of a figure or of the small frame a chart is drawn from."""
+        key = (name,) + tuple(params) + (CODE_VERSION, upstream_fingerprint)
+        value = self.figures.get(key)
+        if value is None:
+            value = self.figures.put(key, build())
+        return value
+
+    def invalidate(self, oem=None, chassis_number=None):
+        """Drop raw entries for an OEM and/or chassis; dependent layers age out by LRU."""
+        self.raw.discard(lambda key: (oem is None or key[1] == oem) and
+                                     (chassis_number is None or key[2] == chassis_number))
+
+    def stats(self):
+        return [layer.stats() for layer in (self.raw, self.clean, self.daily, self.figures)]
+
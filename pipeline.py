@@ -0,0 +1,134 @@
+from dataclasses import dataclass
+from typing import Optional
+
+import pandas as pd
+
+from daily_rollup import DailyRollup
+from insights import generate_dynamic_insights
+from insights import generate_narrative_insights
+from instrumentation import DISABLED
+from quantile_sketch import iqr_mask
+from schema import date_slice
+from sessions import Sessions, daily_session_totals, sessionize
+
+
+@dataclass
+class VehicleAnalysis:
+    chassis_number: str
+    vehicle_date_range: Optional[tuple]
+    filtered: pd.DataFrame
+    clean: pd.DataFrame
+    daily: pd.DataFrame
+    sessions: Sessions
+    insights: Optional[dict]
+
+
+def filter_vehicle(df, chassis_number, start_date, end_date):
+    """Rows of one chassis inside [start_date, end_date] with tz-naive timestamps.
+
+    Also returns the chassis's full recorded date range before the date
+    filter, which the dashboard shows as the loan journey. Frames from
+    schema.normalize_telemetry that hold only this chassis are cut with a
+    slice rather than copied.
+    """
+    if df.empty:
+        # A fetch without rows has no columns either
+        return df, None
+    is_chassis = df['chassis_number'] == chassis_number
+    df_filtered = df if is_chassis.all() else df[is_chassis]
+    recorded_at = df_filtered['recorded_at']
+    if not pd.api.types.is_datetime64_any_dtype(recorded_at) or recorded_at.dt.tz is not None:
+        df_filtered = df_filtered.assign(recorded_at=pd.to_datetime(recorded_at).dt.tz_localize(None))
+    if df_filtered.empty:
+        return df_filtered, None
+
+    vehicle_date_range = (df_filtered['recorded_at'].min(), df_filtered['recorded_at'].max())
+    return date_slice(df_filtered, start_date, end_date), vehicle_date_range
+
+
+def clean_odometer(df_filtered, window=None):
+    in_bounds = iqr_mask(df_filtered, 'odometer', window=window)
+    df_clean = df_filtered if in_bounds.all() else df_filtered[in_bounds]
+    if df_clean['recorded_at'].is_monotonic_increasing:
+        return df_clean
+    return df_clean.sort_values(by='recorded_at')
+
+
+def analyze_vehicle(df, chassis_number, start_date, end_date, recorder=DISABLED):
+    """Filter, clean and roll up one vehicle's telemetry; no UI calls.
+
+    Each step runs as a named stage of `recorder` (see instrumentation.py).
+    """
+    df_filtered, vehicle_date_range, df_clean = prepare_vehicle(df, chassis_number, start_date, end_date, recorder)
+    daily, sessions, insights = summarize_vehicle(df_clean, recorder)
+    return VehicleAnalysis(chassis_number, vehicle_date_range, df_filtered, df_clean, daily, sessions, insights)
+
+
+def prepare_vehicle(df, chassis_number, start_date, end_date, recorder=DISABLED):
+    """Filtered and odometer-cleaned rows plus the chassis's recorded date range."""
+    with recorder.stage('filter', rows=len(df)):
+        df_filtered, vehicle_date_range = filter_vehicle(df, chassis_number, start_date, end_date)
+    if df_filtered.empty:
+        return df_filtered, vehicle_date_range, df_filtered
+
+    with recorder.stage('iqr_cleaning', rows=len(df_filtered)):
+        df_clean = clean_odometer(df_filtered)
+    return df_filtered, vehicle_date_range, df_clean
+
+
+def summarize_vehicle(df_clean, recorder=DISABLED):
+    """Daily rollup and session tables of cleaned rows, and the insights built from them (None without data)."""
+    with recorder.stage('daily_rollup', rows=len(df_clean)):
+        daily = DailyRollup.from_frame(df_clean) if not df_clean.empty else DailyRollup().result()
+    with recorder.stage('sessions', rows=len(df_clean)):
+        sessions = sessionize(df_clean)
+    with recorder.stage('insights', rows=len(daily)):
+        insights = generate_dynamic_insights(daily, sessions) if not daily.empty else None
+    return daily, sessions, insights
+
+
+def build_narrative_insights(insights, daily, sessions=None):
+    if sessions is None:
+        return generate_narrative_insights(
+            insights,
+            daily_distance=daily['distance'],
+            charging_events=daily['soc_net'],
+            idle_periods=daily['key_off_samples']
+        )
+    totals = daily_session_totals(sessions, daily.index)
+    return generate_narrative_insights(
+        insights,
+        daily_distance=daily['distance'],
+        charging_events=totals['charging_sessions'],
+        idle_periods=totals['idle_hours']
+    )
+
+
+def vehicle_metrics(daily, insights):
+    """Flat record of the dashboard's headline numbers for batch reporting."""
+    return {
+        'days': len(daily),
+        'avg_daily_distance': insights['avg_daily_distance'],
+        'total_distance': insights['total_distance'],
+        'high_util_days': insights['high_util_days'],
+        'low_util_days': insights['low_util_days'],
+        'deep_discharge_count': insights['deep_discharge_count'],
+        'total_fce': daily['fce'].sum(),
+        'avg_fce_per_day': daily['fce'].mean(),
+        'avg_charging_per_day': insights['avg_charging_per_day'],
+        'long_idle_days': insights['long_idle_days'],
+        'trip_count': insights.get('trip_count'),
+        'charging_sessions': insights.get('charging_sessions')
+    }
+
+
+def utilization_moving_averages(daily):
+    daily_utilization = daily['odometer_max'].diff().fillna(0)
+    utilization_df = pd.DataFrame({
+        'Date': daily_utilization.index,
+        'Daily Utilization (km)': daily_utilization.values
+    })
+
+    utilization_df['7-Day MA'] = utilization_df['Daily Utilization (km)'].rolling(window=7).mean()
+    utilization_df['30-Day MA'] = utilization_df['Daily Utilization (km)'].rolling(window=30).mean()
+    return utilization_df
@@ -0,0 +1,138 @@
+import bisect
+import json
+import math
+
+import numpy as np
+import pandas as pd
+
+DEFAULT_K = 200
+MIN_CAPACITY = 8
+CAPACITY_DECAY = 2 / 3
+IQR_FACTOR = 1.5
+
+
+class KLLSketch:
+    """Mergeable approximate quantile sketch (Karnin, Lang and Liberty).
+
+    Items live in levels of compactors; an item on level h stands for 2**h
+    inputs. When a level outgrows its capacity it is sorted and every other
+    item is promoted to the next level. Rank error is roughly 1.7 / k of the
+    number of items, independent of how many values have been added, and
+    two sketches built on different chunks or vehicles can be merged.
+    """
+
+    def __init__(self, k=DEFAULT_K, seed=0):
+        self.k = k
+        self.seed = seed
+        self.n = 0
+        self.levels = [np.empty(0)]
+
+    @classmethod
+    def for_error(cls, rank_error, seed=0):
+        return cls(k=math.ceil(1.7 / rank_error), seed=seed)
+
+    def __len__(self):
+        return self.n
+
+    def update(self, values):
+        values = np.asarray(values, dtype=float).ravel()
+        values = values[~np.isnan(values)]
+        if values.size:
+            self.levels[0] = np.concatenate([self.levels[0], values])
+            self.n += values.size
+            self._compress()
+        return self
+
+    def merge(self, other):
+        for level, items in enumerate(other.levels):
+            if level == len(self.levels):
+                self.levels.append(np.empty(0))
+            self.levels[level] = np.concatenate([self.levels[level], items])
+        self.n += other.n
+        self._compress()
+        return self
+
+    def quantiles(self, qs):
+        qs = np.atleast_1d(np.asarray(qs, dtype=float))
+        if self.n == 0:
+            return np.full(qs.shape, np.nan)
+        items = np.concatenate(self.levels)
+        weights = np.concatenate([np.full(len(items), 2 ** level) for level, items in enumerate(self.levels)])
+        order = np.argsort(items, kind='stable')
+        items = items[order]
+        cumulative = np.cumsum(weights[order])
+        positions = np.searchsorted(cumulative, qs * cumulative[-1], side='left')
+        return items[np.clip(positions, 0, len(items) - 1)]
+
+    def to_json(self):
+        return json.dumps({
+            'k': self.k,
+            'seed': self.seed,
+            'n': self.n,
+            'levels': [items.tolist() for items in self.levels]
+        })
+
+    @classmethod
+    def from_json(cls, payload):
+        state = json.loads(payload)
+        sketch = cls(state['k'], state['seed'])
+        sketch.n = state['n']
+        sketch.levels = [np.asarray(items, dtype=float) for items in state['levels']]
+        return sketch
+
+    def _capacity(self, level):
+        depth = len(self.levels) - level - 1
+        return max(MIN_CAPACITY, math.ceil(self.k * CAPACITY_DECAY ** depth))
+
+    def _compress(self):
+        rng = np.random.default_rng([self.seed, self.n])
+        level = 0
+        while level < len(self.levels):
+            items = self.levels[level]
+            if len(items) > self._capacity(level):
+                if level + 1 == len(self.levels):
+                    self.levels.append(np.empty(0))
+                items = np.sort(items)
+                kept = items[len(items) - len(items) % 2:]
+                promoted = items[rng.integers(2):len(items) - len(items) % 2:2]
+                self.levels[level] = kept
+                self.levels[level + 1] = np.concatenate([self.levels[level + 1], promoted])
+            level += 1
+
+
+def iqr_bounds(sketch, factor=IQR_FACTOR):
+    q1, q3 = sketch.quantiles([0.25, 0.75])
+    iqr = q3 - q1
+    return q1 - factor * iqr, q3 + factor * iqr
+
+
+def iqr_mask(df, column='odometer', k=DEFAULT_K, window=None, factor=IQR_FACTOR):
+    """Boolean mask of rows whose `column` lies within the sketch-based IQR bounds.
+
+    With `window=None` the bounds come from one sketch over the whole frame.
+    With a window such as '30D', each day is checked against the bounds of
+    the trailing window that ends on that day, built by merging per-day
+    sketches, so new days can be cleaned without revisiting old rows.
+    """
+    values = df[column]
+    if window is None:
+        lower, upper = iqr_bounds(KLLSketch(k).update(values.values), factor)
+        return values.between(lower, upper)
+
+    day = df['recorded_at'].dt.normalize()
+    daily_sketches = {d: KLLSketch(k).update(group.values) for d, group in values.groupby(day.values)}
+    window = pd.Timedelta(window)
+
+    days = sorted(daily_sketches)
+    bounds = {}
+    for position, current in enumerate(days):
+        first = bisect.bisect_right(days, current - window)
+        merged = KLLSketch(k)
+        for d in days[first:position + 1]:
+            merged.merge(daily_sketches[d])
+        bounds[current] = iqr_bounds(merged, factor)
+
+    bounds = pd.DataFrame.from_dict(bounds, orient='index', columns=['lower', 'upper'])
+    lower = day.map(bounds['lower'])
+    upper = day.map(bounds['upper'])
+    return (values >= lower) & (values <= upper)
@@ -0,0 +1,324 @@
+"""Persistent per-day rollups of each vehicle, refreshed incrementally.
+
+RollupStore keeps a SQLite table with one row per OEM/chassis/day holding
+the DailyRollup columns, and one watermark row per chassis:
+
+    first_day          first day the store covers
+    completed_through  last day folded in; later days are still open
+    last_sample        recorded_at, SOC and odometer of the last sample,
+                       so the first delta of a refresh is counted once
+    sketch             the KLLSketch of all odometer readings seen,
+                       whose IQR bounds clean each new chunk
+    code_version       hash of the rollup code that wrote the rows
+
+A store-wide revision counter goes up with every write, so readers can
+key caches of fleet-wide queries on revision().
+
+refresh() fetches only the days after the watermark, up to yesterday at
+the latest, and folds them in, recomputing the last few completed days
+from the same fetch so packets that arrived late are included. reopen()
+recomputes an older range of completed days from raw packets, together
+with the following day whose first delta depends on them. A chassis is
+rebuilt from scratch when an earlier day is requested than the store
+covers or when the rollup code has changed.
+
+Rows are cleaned with bounds from every reading seen so far rather than
+the dashboard's selected range, so a day can differ slightly from the
+live pipeline's result when a reading lies close to a bound.
+"""
+import json
+import os
+import sqlite3
+import threading
+from contextlib import closing
+
+import pandas as pd
+
+from daily_rollup import AGGREGATIONS, DailyRollup
+from memo import code_version
+from quantile_sketch import KLLSketch, iqr_bounds
+from schema import normalize_telemetry
+from telemetry_cache import FETCH_FORMAT
+
+ROLLUP_CODE_VERSION = code_version(('daily_rollup', 'quantile_sketch', 'schema', 'rollup_store'))
+TIMESTAMP_COLUMNS = ('run_start', 'run_end')
+INTEGER_COLUMNS = ('charge_events', 'samples', 'key_on_samples', 'key_off_samples')
+DATE_FORMAT = '%Y-%m-%d'
+DEFAULT_LOOKBACK_DAYS = 2
+
+
+def _column_type(column):
+    if column in TIMESTAMP_COLUMNS:
+        return 'TEXT'
+    return 'INTEGER' if column in INTEGER_COLUMNS else 'REAL'
+
+
+SCHEMA = f"""
+CREATE TABLE IF NOT EXISTS daily_rollup (
+    oem TEXT NOT NULL,
+    chassis_number TEXT NOT NULL,
+    date TEXT NOT NULL,
+    {', '.join(f'{column} {_column_type(column)}' for column in AGGREGATIONS)},
+    PRIMARY KEY (oem, chassis_number, date)
+);
+CREATE TABLE IF NOT EXISTS watermarks (
+    oem TEXT NOT NULL,
+    chassis_number TEXT NOT NULL,
+    first_day TEXT NOT NULL,
+    completed_through TEXT NOT NULL,
+    last_sample TEXT,
+    sketch TEXT NOT NULL,
+    code_version TEXT NOT NULL,
+    PRIMARY KEY (oem, chassis_number)
+);
+CREATE TABLE IF NOT EXISTS revision (
+    id INTEGER PRIMARY KEY CHECK (id = 0),
+    value INTEGER NOT NULL
+);
+INSERT OR IGNORE INTO revision VALUES (0, 0);
+"""
+
+
+class RollupStore:
+    """SQLite store of DailyRollup rows with a watermark per chassis.
+
+    `fetch` arguments have the signature of `warehouse.fetch_telemetry`
+    (oem, chassis_number, start_date, end_date), such as
+    TelemetryCache.load.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self._lock = threading.Lock()
+        self._chassis_locks = {}
+        with closing(self._connect()) as conn:
+            conn.execute('PRAGMA journal_mode=WAL')
+            conn.executescript(SCHEMA)
+
+    def refresh(self, oem, chassis_number, fetch, since, until=None, lookback_days=DEFAULT_LOOKBACK_DAYS):
+        """Fold days from `since` (or the watermark) up to the day before `until` in; returns days written.
+
+        `until` defaults to, and is capped at, today: days still receiving
+        packets are never stored. When new days are folded in, the last
+        `lookback_days` completed days are recomputed from the same fetch,
+        so packets that arrived after their day was folded are picked up.
+        """
+        since = pd.Timestamp(since).normalize()
+        today = pd.Timestamp.now().normalize()
+        until = min(pd.Timestamp(until).normalize(), today) if until is not None else today
+        with self._chassis_lock(oem, chassis_number):
+            watermark = self.watermark(oem, chassis_number)
+            if watermark is None or since < watermark['first_day'] or watermark['code_version'] != ROLLUP_CODE_VERSION:
+                first_day, start, previous, sketch = since, since, None, KLLSketch()
+                rebuild = True
+                if watermark is not None:
+                    until = max(until, watermark['completed_through'] + pd.Timedelta(days=1))
+            else:
+                first_day = watermark['first_day']
+                start = watermark['completed_through'] + pd.Timedelta(days=1)
+                previous, sketch = watermark['last_sample'], watermark['sketch']
+                rebuild = False
+            if start >= until:
+                return 0
+
+            fold_from = fetch_from = start
+            if not rebuild and lookback_days:
+                fold_from = max(first_day, start - pd.Timedelta(days=lookback_days))
+                fetch_from, previous = self._anchor(oem, chassis_number, fold_from), None
+
+            df = self._fetch(fetch, oem, chassis_number, fetch_from, until)
+            if not df.empty:
+                # Readings of recomputed days are already in the sketch
+                lower, upper = iqr_bounds(sketch.update(df.loc[df['recorded_at'] >= start, 'odometer'].values))
+                df = df[df['odometer'].between(lower, upper)]
+            rollup = DailyRollup(previous).add(df)
+            daily = rollup.result()
+            daily = daily[daily.index >= fold_from]
+            last_sample = rollup.previous
+            if last_sample is None and not rebuild:
+                last_sample = watermark['last_sample']
+
+            with closing(self._connect()) as conn, conn:
+                if rebuild:
+                    conn.execute('DELETE FROM daily_rollup WHERE oem = ? AND chassis_number = ?', (oem, chassis_number))
+                else:
+                    conn.execute(
+                        'DELETE FROM daily_rollup WHERE oem = ? AND chassis_number = ? AND date >= ?',
+                        (oem, chassis_number, fold_from.strftime(DATE_FORMAT))
+                    )
+                self._write_days(conn, oem, chassis_number, daily)
+                conn.execute(
+                    'INSERT OR REPLACE INTO watermarks VALUES (?, ?, ?, ?, ?, ?, ?)',
+                    (oem, chassis_number, first_day.strftime(DATE_FORMAT),
+                     (until - pd.Timedelta(days=1)).strftime(DATE_FORMAT),
+                     _dump_sample(last_sample), sketch.to_json(), ROLLUP_CODE_VERSION)
+                )
+                _bump_revision(conn)
+            return len(daily)
+
+    def reopen(self, oem, chassis_number, fetch, first_day, last_day):
+        """Recompute completed days from first_day to last_day (and the day after) from raw packets; returns days written.
+
+        refresh() already recomputes its lookback window; this is for
+        packets that arrive later than that.
+        """
+        with self._chassis_lock(oem, chassis_number):
+            watermark = self.watermark(oem, chassis_number)
+            if watermark is None:
+                return 0
+            completed_through = watermark['completed_through']
+            first_day = max(pd.Timestamp(first_day).normalize(), watermark['first_day'])
+            through = min(pd.Timestamp(last_day).normalize() + pd.Timedelta(days=1), completed_through)
+            if first_day > through:
+                return 0
+
+            start = self._anchor(oem, chassis_number, first_day)
+            df = self._fetch(fetch, oem, chassis_number, start, through + pd.Timedelta(days=1))
+            if not df.empty:
+                lower, upper = iqr_bounds(watermark['sketch'])
+                df = df[df['odometer'].between(lower, upper)]
+            rollup = DailyRollup().add(df)
+            daily = rollup.result()
+            daily = daily[(daily.index >= first_day) & (daily.index <= through)]
+
+            with closing(self._connect()) as conn, conn:
+                conn.execute(
+                    'DELETE FROM daily_rollup WHERE oem = ? AND chassis_number = ? AND date BETWEEN ? AND ?',
+                    (oem, chassis_number, first_day.strftime(DATE_FORMAT), through.strftime(DATE_FORMAT))
+                )
+                self._write_days(conn, oem, chassis_number, daily)
+                if through == completed_through and rollup.previous is not None:
+                    conn.execute(
+                        'UPDATE watermarks SET last_sample = ? WHERE oem = ? AND chassis_number = ?',
+                        (_dump_sample(rollup.previous), oem, chassis_number)
+                    )
+                _bump_revision(conn)
+            return len(daily)
+
+    def daily(self, oem, chassis_number, start_date, end_date):
+        """Stored days of one chassis between start_date and end_date, laid out like DailyRollup.result()."""
+        with closing(self._connect()) as conn:
+            daily = pd.read_sql_query(
+                f"SELECT date, {', '.join(AGGREGATIONS)} FROM daily_rollup "
+                'WHERE oem = ? AND chassis_number = ? AND date BETWEEN ? AND ? ORDER BY date',
+                conn,
+                params=(oem, chassis_number, pd.Timestamp(start_date).strftime(DATE_FORMAT),
+                        pd.Timestamp(end_date).strftime(DATE_FORMAT))
+            )
+        daily.index = pd.DatetimeIndex(pd.to_datetime(daily.pop('date')), name='date')
+        for column in TIMESTAMP_COLUMNS:
+            daily[column] = pd.to_datetime(daily[column])
+        daily['fce'] = daily['soc_discharge'] / 100
+        return daily
+
+    def fleet_daily(self, start_date, end_date, oem=None, columns=('distance', 'soc_discharge', 'soc_charge')):
+        """One row per stored vehicle-day (oem, chassis_number, date, columns), optionally for one OEM."""
+        query = (
+            f"SELECT oem, chassis_number, date, {', '.join(columns)} FROM daily_rollup "
+            'WHERE date BETWEEN ? AND ?'
+        )
+        params = (pd.Timestamp(start_date).strftime(DATE_FORMAT), pd.Timestamp(end_date).strftime(DATE_FORMAT))
+        if oem is not None:
+            query += ' AND oem = ?'
+            params += (oem,)
+        with closing(self._connect()) as conn:
+            daily = pd.read_sql_query(query, conn, params=params)
+        daily['date'] = pd.to_datetime(daily['date'])
+        if 'soc_discharge' in daily.columns:
+            daily['fce'] = daily['soc_discharge'] / 100
+        return daily
+
+    def watermark(self, oem, chassis_number):
+        with closing(self._connect()) as conn:
+            row = conn.execute(
+                'SELECT first_day, completed_through, last_sample, sketch, code_version FROM watermarks '
+                'WHERE oem = ? AND chassis_number = ?',
+                (oem, chassis_number)
+            ).fetchone()
+        if row is None:
+            return None
+        first_day, completed_through, last_sample, sketch, version = row
+        return {
+            'first_day': pd.Timestamp(first_day),
+            'completed_through': pd.Timestamp(completed_through),
+            'last_sample': _load_sample(last_sample),
+            'sketch': KLLSketch.from_json(sketch),
+            'code_version': version
+        }
+
+    def revision(self):
+        """Counter that changes whenever stored days are written or deleted."""
+        with closing(self._connect()) as conn:
+            return conn.execute('SELECT value FROM revision').fetchone()[0]
+
+    def invalidate(self, oem=None, chassis_number=None):
+        """Delete stored days and watermarks, optionally narrowed to an OEM and chassis."""
+        clauses = [clause for clause, value in (('oem = ?', oem), ('chassis_number = ?', chassis_number)) if value is not None]
+        where = f" WHERE {' AND '.join(clauses)}" if clauses else ''
+        params = tuple(value for value in (oem, chassis_number) if value is not None)
+        with closing(self._connect()) as conn, conn:
+            conn.execute(f'DELETE FROM daily_rollup{where}', params)
+            conn.execute(f'DELETE FROM watermarks{where}', params)
+            _bump_revision(conn)
+
+    def _connect(self):
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        return sqlite3.connect(self.path, timeout=30)
+
+    def _chassis_lock(self, oem, chassis_number):
+        # Refreshes of different vehicles run concurrently; one vehicle's refreshes run one at a time
+        with self._lock:
+            return self._chassis_locks.setdefault((oem, chassis_number), threading.Lock())
+
+    def _anchor(self, oem, chassis_number, first_day):
+        # Start from the last stored day before first_day so first_day's first delta is counted
+        with closing(self._connect()) as conn:
+            anchor = conn.execute(
+                'SELECT MAX(date) FROM daily_rollup WHERE oem = ? AND chassis_number = ? AND date < ?',
+                (oem, chassis_number, first_day.strftime(DATE_FORMAT))
+            ).fetchone()[0]
+        return pd.Timestamp(anchor) if anchor is not None else first_day
+
+    def _fetch(self, fetch, oem, chassis_number, start, until):
+        df = fetch(oem, chassis_number, start.strftime(FETCH_FORMAT), (until - pd.Timedelta(seconds=1)).strftime(FETCH_FORMAT))
+        if df.empty:
+            return df
+        df = normalize_telemetry(df)
+        return df[(df['recorded_at'] >= start) & (df['recorded_at'] < until)]
+
+    def _write_days(self, conn, oem, chassis_number, daily):
+        if daily.empty:
+            return
+        rows = daily[list(AGGREGATIONS)].astype(object)
+        for column in TIMESTAMP_COLUMNS:
+            rows[column] = daily[column].map(lambda value: value.isoformat() if pd.notna(value) else None)
+        rows = rows.where(rows.notna(), None)
+        conn.executemany(
+            f"INSERT OR REPLACE INTO daily_rollup VALUES ({', '.join('?' * (len(AGGREGATIONS) + 3))})",
+            [(oem, chassis_number, day.strftime(DATE_FORMAT), *values)
+             for day, values in zip(daily.index, rows.itertuples(index=False, name=None))]
+        )
+
+
+def _bump_revision(conn):
+    conn.execute('UPDATE revision SET value = value + 1')
+
+
+def _dump_sample(sample):
+    if sample is None:
+        return None
+    return json.dumps({
+        'recorded_at': pd.Timestamp(sample['recorded_at']).isoformat(),
+        'soc': float(sample['soc']),
+        'odometer': float(sample['odometer'])
+    })
+
+
+def _load_sample(payload):
+    if payload is None:
+        return None
+    sample = json.loads(payload)
+    sample['recorded_at'] = pd.Timestamp(sample['recorded_at'])
+    return sample
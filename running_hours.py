@@ -0,0 +1,53 @@
+import pandas as pd
+
+HALF_DAY = pd.Timedelta(hours=12)
+DEFAULT_MAX_GAP = pd.Timedelta(minutes=5)
+
+
+def daily_running_hours(df, max_gap=DEFAULT_MAX_GAP):
+    """Daytime and nighttime running hours per day, weighted by sample spacing.
+
+    Every key-on sample is credited with the time until the next sample,
+    capped at max_gap so dropped packets do not count as driving. Intervals
+    that run past 12:00 or 00:00 are split at the boundary. Daytime is
+    12:00-24:00 and nighttime 00:00-12:00. Returns 'Date', 'Daytime Hours',
+    'Nighttime Hours' and 'Running Time Range' with one row per day.
+    """
+    max_gap = pd.Timedelta(max_gap)
+    if max_gap > HALF_DAY:
+        raise ValueError("max_gap must not exceed 12 hours")
+
+    if not df['recorded_at'].is_monotonic_increasing:
+        df = df.sort_values(by='recorded_at')
+    recorded_at = df['recorded_at']
+    credit = (recorded_at.shift(-1) - recorded_at).fillna(pd.Timedelta(0)).clip(upper=max_gap)
+
+    running = (df['key_on'] == 1).values
+    if not running.any():
+        return pd.DataFrame(columns=['Date', 'Daytime Hours', 'Nighttime Hours', 'Running Time Range'])
+    start = recorded_at[running]
+    credit = credit[running]
+
+    boundary = start.dt.floor('12h') + HALF_DAY
+    before = credit.where(start + credit <= boundary, boundary - start)
+    after = credit - before
+
+    pieces = pd.DataFrame({
+        'Date': pd.concat([start.dt.normalize(), boundary.dt.normalize()], ignore_index=True),
+        'is_day': pd.concat([start.dt.hour >= 12, boundary.dt.hour >= 12], ignore_index=True),
+        'hours': pd.concat([before, after], ignore_index=True).dt.total_seconds() / 3600
+    })
+    pieces = pieces[pieces['hours'] > 0]
+    hours = pieces.pivot_table(index='Date', columns='is_day', values='hours', aggfunc='sum', fill_value=0)
+    hours = hours.reindex(columns=[True, False], fill_value=0)
+
+    first_last = start.groupby(start.dt.normalize().values).agg(['min', 'max'])
+    time_range = first_last['min'].dt.strftime('%H:%M') + ' - ' + first_last['max'].dt.strftime('%H:%M')
+
+    running_hours_df = pd.DataFrame({
+        'Daytime Hours': hours[True],
+        'Nighttime Hours': hours[False]
+    }).join(time_range.rename('Running Time Range'), how='outer')
+    running_hours_df = running_hours_df.fillna({'Daytime Hours': 0, 'Nighttime Hours': 0, 'Running Time Range': ''})
+    running_hours_df.index.name = 'Date'
+    return running_hours_df.reset_index()
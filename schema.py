@@ -0,0 +1,93 @@
+"""Compact in-memory schema for raw telemetry frames.
+
+normalize_telemetry() converts a frame as returned by the warehouse to:
+
+    chassis_number  category
+    recorded_at     datetime64[ns], tz-naive, sorted ascending
+    odometer        float64
+    soc             float32
+    key_on          uint8
+
+Odometer stays float64: readings reach six figures, where float32 only
+resolves about 8 m, which is the same order as a one-minute odometer
+delta. recorded_at stays a column rather than the index because every
+stage selects and groups on it as a column; the frame is sorted so date
+ranges can be cut with searchsorted slices instead of boolean copies.
+SOC and odometer NULLs become NaN; a NULL key_on keeps the vehicle's
+previous state so the column still fits in uint8.
+"""
+import sys
+
+import pandas as pd
+
+TELEMETRY_DTYPES = {
+    'chassis_number': 'category',
+    'odometer': 'float64',
+    'soc': 'float32',
+    'key_on': 'uint8'
+}
+
+
+def normalize_telemetry(df):
+    """Telemetry with compact dtypes, tz-naive timestamps and rows sorted by recorded_at."""
+    recorded_at = df['recorded_at']
+    if not pd.api.types.is_datetime64_any_dtype(recorded_at):
+        recorded_at = pd.to_datetime(recorded_at)
+    if recorded_at.dt.tz is not None:
+        recorded_at = recorded_at.dt.tz_localize(None)
+
+    df = df.assign(recorded_at=recorded_at)
+    if not df['recorded_at'].is_monotonic_increasing:
+        df = df.sort_values(by='recorded_at', kind='stable')
+    if 'key_on' in df.columns and df['key_on'].isna().any():
+        df = df.assign(key_on=_fill_key_on(df))
+
+    dtypes = {column: dtype for column, dtype in TELEMETRY_DTYPES.items() if column in df.columns}
+    return df.astype(dtypes).reset_index(drop=True)
+
+
+def _fill_key_on(df):
+    """NULL ignition flags (nullable Int64 from the warehouse) keep the last known state; key off before any."""
+    key_on = df['key_on']
+    if 'chassis_number' in df.columns:
+        filled = key_on.groupby(df['chassis_number'], observed=True, sort=False).ffill()
+    else:
+        filled = key_on.ffill()
+    return filled.fillna(0)
+
+
+def date_slice(df, start_date, end_date):
+    """Rows with start_date <= recorded_at <= end_date, as a slice when recorded_at is sorted."""
+    recorded_at = df['recorded_at']
+    start, end = pd.Timestamp(start_date), pd.Timestamp(end_date)
+    if not recorded_at.is_monotonic_increasing:
+        return df[(recorded_at >= start) & (recorded_at <= end)]
+    first = recorded_at.searchsorted(start, side='left')
+    last = recorded_at.searchsorted(end, side='right')
+    return df.iloc[first:last]
+
+
+def memory_report(df):
+    """Bytes per column of a normalized frame next to the same data in the warehouse's default dtypes.
+
+    The default layout is an object chassis column and 8-byte timestamps,
+    floats and integers, as returned by `warehouse.fetch_telemetry`.
+    """
+    rows = []
+    for column in df.columns:
+        values = df[column]
+        after = values.memory_usage(index=False, deep=True)
+        if isinstance(values.dtype, pd.CategoricalDtype):
+            counts = values.cat.codes.value_counts()
+            counts = counts[counts.index >= 0]
+            string_bytes = sum(sys.getsizeof(values.cat.categories[code]) * count for code, count in counts.items())
+            before = len(values) * 8 + string_bytes
+        else:
+            before = len(values) * 8
+        rows.append({'column': column, 'dtype': str(values.dtype), 'default_bytes': before, 'bytes': after})
+
+    report = pd.DataFrame(rows)
+    total = {'column': 'total', 'dtype': '', 'default_bytes': report['default_bytes'].sum(), 'bytes': report['bytes'].sum()}
+    report = pd.concat([report, pd.DataFrame([total])], ignore_index=True)
+    report['reduction'] = report['default_bytes'] / report['bytes']
+    return report
@@ -0,0 +1,140 @@
+"""Trips, charging sessions and idle periods from raw telemetry.
+
+Every sample is given a state:
+
+    trip      key on
+    charging  key off and SOC rising
+    idle      key off otherwise
+
+SOC steps no larger than `soc_noise` count as flat. A flat sample keeps
+the rising trend of the last real SOC step for up to `trend_hold`, so a
+slow charger that only moves SOC every few samples is one session. Runs
+of equal state are run-length encoded into sessions; a gap longer than
+`max_gap` between samples ends the session and its deltas are ignored.
+Charging sessions that gain less than `min_charge` are treated as idle.
+
+Each sample's SOC and odometer delta belong to the interval since the
+previous sample, so sessions tile time: a session starts at the sample
+before its first one (unless a gap precedes it) and ends at its last.
+"""
+from dataclasses import dataclass
+
+import numpy as np
+import pandas as pd
+
+TRIP, CHARGING, IDLE = 0, 1, 2
+
+DEFAULT_MAX_GAP = pd.Timedelta(minutes=15)
+DEFAULT_TREND_HOLD = pd.Timedelta(minutes=10)
+DEFAULT_SOC_NOISE = 0.1
+DEFAULT_MIN_CHARGE = 1.0
+
+TRIP_COLUMNS = ['start', 'end', 'duration_hours', 'distance', 'soc_start', 'soc_end', 'soc_used', 'samples']
+CHARGING_COLUMNS = ['start', 'end', 'duration_hours', 'soc_start', 'soc_end', 'soc_gained', 'rate_per_hour', 'samples']
+IDLE_COLUMNS = ['start', 'end', 'duration_hours', 'soc_change', 'samples']
+
+
+@dataclass
+class Sessions:
+    trips: pd.DataFrame
+    charging: pd.DataFrame
+    idle: pd.DataFrame
+
+
+def sessionize(df, max_gap=DEFAULT_MAX_GAP, soc_noise=DEFAULT_SOC_NOISE, trend_hold=DEFAULT_TREND_HOLD,
+               min_charge=DEFAULT_MIN_CHARGE):
+    """Session tables for one vehicle's telemetry (recorded_at, odometer, soc, key_on)."""
+    if df.empty:
+        return Sessions(
+            pd.DataFrame(columns=TRIP_COLUMNS),
+            pd.DataFrame(columns=CHARGING_COLUMNS),
+            pd.DataFrame(columns=IDLE_COLUMNS)
+        )
+    if not df['recorded_at'].is_monotonic_increasing:
+        df = df.sort_values(by='recorded_at')
+
+    recorded_at = df['recorded_at'].reset_index(drop=True)
+    soc = pd.Series(df['soc'].values, dtype='float64')
+    key_on = df['key_on'].values == 1
+    contiguous = (recorded_at.diff() <= pd.Timedelta(max_gap)).values
+
+    soc_delta = soc.diff().where(contiguous, 0.0).fillna(0.0)
+    odometer_delta = pd.Series(df['odometer'].values, dtype='float64').diff().where(contiguous, 0.0).fillna(0.0)
+
+    stepped = (soc_delta.abs() > soc_noise).values | key_on
+    rising = pd.Series(np.where(stepped, (soc_delta > soc_noise).values & ~key_on, np.nan)).ffill()
+    last_step = recorded_at.where(stepped).ffill()
+    charging = ~key_on & (rising == 1).values & ((recorded_at - last_step) <= pd.Timedelta(trend_hold)).values
+    state = np.where(key_on, TRIP, np.where(charging, CHARGING, IDLE))
+
+    samples = pd.DataFrame({
+        'start': recorded_at.shift().where(contiguous, recorded_at),
+        'end': recorded_at,
+        'soc_delta': soc_delta,
+        'distance': odometer_delta,
+        'soc_end': soc
+    })
+
+    table, session = _run_lengths(samples, state, contiguous)
+    too_small = table.index[(table['state'] == CHARGING) & (table['soc_delta'] < min_charge)]
+    if len(too_small):
+        state = np.where(np.isin(session, too_small), IDLE, state)
+        table, _ = _run_lengths(samples, state, contiguous)
+
+    table['duration_hours'] = (table['end'] - table['start']).dt.total_seconds() / 3600
+    table['soc_start'] = table['soc_end'] - table['soc_delta']
+
+    trips = table[table['state'] == TRIP].assign(soc_used=lambda t: -t['soc_delta'])
+    charging = table[table['state'] == CHARGING].rename(columns={'soc_delta': 'soc_gained'})
+    charging = charging.assign(rate_per_hour=charging['soc_gained'] / charging['duration_hours'].where(charging['duration_hours'] > 0))
+    idle = table[table['state'] == IDLE].rename(columns={'soc_delta': 'soc_change'})
+
+    return Sessions(
+        trips[TRIP_COLUMNS].reset_index(drop=True),
+        charging[CHARGING_COLUMNS].reset_index(drop=True),
+        idle[IDLE_COLUMNS].reset_index(drop=True)
+    )
+
+
+def daily_session_totals(sessions, days=None):
+    """Per-day session counts and totals, each session counted on the day it starts.
+
+    Columns: trips, trip_hours, charging_sessions, soc_charged, idle_hours.
+    With `days` (such as a DailyRollup index) the result is reindexed to
+    those days with zeros where nothing started.
+    """
+    def by_day(table, column, how):
+        if table.empty:
+            return pd.Series(dtype='float64')
+        return table[column].groupby(table['start'].dt.normalize()).agg(how)
+
+    totals = pd.DataFrame({
+        'trips': by_day(sessions.trips, 'samples', 'size'),
+        'trip_hours': by_day(sessions.trips, 'duration_hours', 'sum'),
+        'charging_sessions': by_day(sessions.charging, 'samples', 'size'),
+        'soc_charged': by_day(sessions.charging, 'soc_gained', 'sum'),
+        'idle_hours': by_day(sessions.idle, 'duration_hours', 'sum')
+    })
+    if days is not None:
+        totals = totals.reindex(days)
+    totals = totals.fillna(0).astype({'trips': int, 'charging_sessions': int})
+    totals.index.name = 'date'
+    return totals
+
+
+def _run_lengths(samples, state, contiguous):
+    """One row per run of equal state (split at gaps) and each sample's run number."""
+    new_run = np.ones(len(state), dtype=bool)
+    new_run[1:] = (state[1:] != state[:-1]) | ~contiguous[1:]
+    session = np.cumsum(new_run) - 1
+
+    table = samples.groupby(session).agg(
+        start=('start', 'min'),
+        end=('end', 'max'),
+        soc_delta=('soc_delta', 'sum'),
+        distance=('distance', 'sum'),
+        soc_end=('soc_end', 'last'),
+        samples=('end', 'size')
+    )
+    table['state'] = state[new_run]
+    return table, session
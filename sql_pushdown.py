@@ -0,0 +1,241 @@
+"""Compile the DailyRollup metrics to SQL so the warehouse returns one row per day.
+
+The query works on epoch seconds so the same text runs on BigQuery, DuckDB
+and SQLite; only a handful of expressions differ per dialect. Deltas use
+LAG over the chassis's samples ordered by time, exactly like the pandas
+rollup: distance and SOC charge include the step across midnight, while
+clipped distance and discharge only count steps within a day. Key-on
+samples are credited with the time to the next sample, capped at
+max_gap_seconds and split at 12:00 and 00:00, to give the same day/night
+hours as running_hours.daily_running_hours.
+
+The dashboard drops odometer readings outside the IQR bounds before
+rolling up; odometer_bounds_sql() computes those bounds for the same
+range in the warehouse (approximate quartiles where the dialect has
+them), to pass as odometer_bounds.
+"""
+import pandas as pd
+
+from quantile_sketch import IQR_FACTOR
+from running_hours import DEFAULT_MAX_GAP
+
+DIALECTS = {
+    'bigquery': {
+        'epoch': 'UNIX_MICROS({column}) / 1000000',
+        'floor': 'CAST(FLOOR({value}) AS INT64)',
+        'mod': 'MOD({value}, {divisor})',
+        'param': '@{name}',
+        'table': '`{table}`',
+        'quartiles': 'SELECT APPROX_QUANTILES(odometer, 4)[OFFSET(1)] AS q1, '
+                     'APPROX_QUANTILES(odometer, 4)[OFFSET(3)] AS q3 FROM samples'
+    },
+    'duckdb': {
+        'epoch': "date_diff('microsecond', TIMESTAMP '1970-01-01', CAST({column} AS TIMESTAMP)) / 1000000.0",
+        'floor': 'CAST(FLOOR({value}) AS BIGINT)',
+        'mod': '({value} % {divisor})',
+        'param': '${name}',
+        'table': '"{table}"',
+        'quartiles': 'SELECT quantile_cont(odometer, 0.25) AS q1, quantile_cont(odometer, 0.75) AS q3 FROM samples'
+    },
+    'sqlite': {
+        'epoch': 'ROUND((julianday({column}) - 2440587.5) * 86400.0, 3)',
+        'floor': 'CAST({value} AS INTEGER)',
+        'mod': '({value} % {divisor})',
+        'param': ':{name}',
+        'table': '"{table}"',
+        # No quantile aggregate: take the nearest-rank readings
+        'quartiles': 'SELECT '
+                     '(SELECT odometer FROM samples ORDER BY odometer LIMIT 1 '
+                     'OFFSET (SELECT (COUNT(*) - 1) / 4 FROM samples)) AS q1, '
+                     '(SELECT odometer FROM samples ORDER BY odometer LIMIT 1 '
+                     'OFFSET (SELECT 3 * (COUNT(*) - 1) / 4 FROM samples)) AS q3'
+    }
+}
+
+ODOMETER_QUARTILES_SQL = """
+WITH samples AS (
+    SELECT odometer
+    FROM {table}
+    WHERE chassis_number = {chassis_number}
+      AND recorded_at BETWEEN {start_date} AND {end_date}
+      AND odometer IS NOT NULL
+)
+{quartiles}
+"""
+
+ROLLUP_SQL = """
+WITH samples AS (
+    SELECT {epoch} AS t, soc, odometer, key_on
+    FROM {table}
+    WHERE chassis_number = {chassis_number}
+      AND recorded_at BETWEEN {start_date} AND {end_date}{odometer_filter}
+),
+deltas AS (
+    SELECT
+        t, soc, odometer, key_on,
+        {day_of_t} AS day,
+        {previous_day} AS previous_day,
+        soc - LAG(soc) OVER w AS soc_diff,
+        odometer - LAG(odometer) OVER w AS odometer_diff,
+        LEAD(t) OVER w - t AS gap
+    FROM samples
+    WINDOW w AS (ORDER BY t)
+),
+daily AS (
+    SELECT
+        day,
+        SUM(COALESCE(odometer_diff, 0)) AS distance,
+        SUM(CASE WHEN day = previous_day AND odometer_diff > 0 THEN odometer_diff ELSE 0 END) AS distance_positive,
+        SUM(CASE WHEN day = previous_day AND soc_diff < 0 THEN -soc_diff ELSE 0 END) AS soc_discharge,
+        SUM(CASE WHEN soc_diff > 0 THEN soc_diff ELSE 0 END) AS soc_charge,
+        SUM(COALESCE(soc_diff, 0)) AS soc_net,
+        SUM(CASE WHEN soc_diff > 0 THEN 1 ELSE 0 END) AS charge_events,
+        COUNT(*) AS samples,
+        SUM(CASE WHEN key_on = 1 THEN 1 ELSE 0 END) AS key_on_samples,
+        SUM(CASE WHEN key_on = 0 THEN 1 ELSE 0 END) AS key_off_samples,
+        MIN(CASE WHEN key_on = 1 THEN t END) AS run_start,
+        MAX(CASE WHEN key_on = 1 THEN t END) AS run_end,
+        MAX(odometer) AS odometer_max,
+        MIN(soc) AS soc_min
+    FROM deltas
+    GROUP BY day
+),
+running AS (
+    SELECT
+        t,
+        CASE WHEN gap IS NULL THEN 0 WHEN gap > {max_gap} THEN {max_gap} ELSE gap END AS credit,
+        ({half_day_of_t} + 1) * 43200 AS boundary
+    FROM deltas
+    WHERE key_on = 1
+),
+pieces AS (
+    SELECT
+        {day_of_t} AS day,
+        {is_day_of_t} AS is_day,
+        CASE WHEN t + credit <= boundary THEN credit ELSE boundary - t END AS seconds
+    FROM running
+    UNION ALL
+    SELECT
+        {day_of_boundary} AS day,
+        {is_day_of_boundary} AS is_day,
+        CASE WHEN t + credit <= boundary THEN 0 ELSE t + credit - boundary END AS seconds
+    FROM running
+),
+hours AS (
+    SELECT
+        day,
+        SUM(CASE WHEN is_day = 1 THEN seconds ELSE 0 END) / 3600.0 AS daytime_hours,
+        SUM(CASE WHEN is_day = 0 THEN seconds ELSE 0 END) / 3600.0 AS nighttime_hours
+    FROM pieces
+    WHERE seconds > 0
+    GROUP BY day
+)
+SELECT
+    daily.*,
+    COALESCE(hours.daytime_hours, 0) AS daytime_hours,
+    COALESCE(hours.nighttime_hours, 0) AS nighttime_hours
+FROM daily
+LEFT JOIN hours ON hours.day = daily.day
+ORDER BY daily.day
+"""
+
+
+def daily_rollup_sql(table, dialect='bigquery', odometer_bounds=False, max_gap=DEFAULT_MAX_GAP):
+    """SQL returning one DailyRollup row per day for a single chassis.
+
+    Parameters are chassis_number, start_date and end_date, plus
+    odometer_lower and odometer_upper when `odometer_bounds` is set (for
+    example IQR bounds from a cached KLLSketch).
+    """
+    spec = DIALECTS[dialect]
+
+    def floor(value):
+        return spec['floor'].format(value=value)
+
+    def param(name):
+        return spec['param'].format(name=name)
+
+    def is_day(seconds):
+        return spec['mod'].format(value=floor(f"{seconds} / 43200"), divisor=2)
+
+    odometer_filter = ''
+    if odometer_bounds:
+        odometer_filter = f"\n      AND odometer BETWEEN {param('odometer_lower')} AND {param('odometer_upper')}"
+
+    return ROLLUP_SQL.format(
+        epoch=spec['epoch'].format(column='recorded_at'),
+        table=spec['table'].format(table=table),
+        chassis_number=param('chassis_number'),
+        start_date=param('start_date'),
+        end_date=param('end_date'),
+        odometer_filter=odometer_filter,
+        day_of_t=floor('t / 86400'),
+        previous_day=floor('LAG(t) OVER w / 86400'),
+        half_day_of_t=floor('t / 43200'),
+        max_gap=int(pd.Timedelta(max_gap).total_seconds()),
+        is_day_of_t=is_day('t'),
+        day_of_boundary=floor('boundary / 86400'),
+        is_day_of_boundary=is_day('boundary')
+    )
+
+
+def odometer_bounds_sql(table, dialect='bigquery'):
+    """SQL returning the first and third odometer quartiles (q1, q3) of a chassis over a range."""
+    spec = DIALECTS[dialect]
+    return ODOMETER_QUARTILES_SQL.format(
+        table=spec['table'].format(table=table),
+        chassis_number=spec['param'].format(name='chassis_number'),
+        start_date=spec['param'].format(name='start_date'),
+        end_date=spec['param'].format(name='end_date'),
+        quartiles=spec['quartiles']
+    )
+
+
+def bounds_from_sql_result(result, factor=IQR_FACTOR):
+    """IQR bounds (lower, upper) from the quartiles query, or None when the range has no readings."""
+    q1, q3 = result['q1'].iloc[0], result['q3'].iloc[0]
+    if pd.isna(q1) or pd.isna(q3):
+        return None
+    iqr = q3 - q1
+    return q1 - factor * iqr, q3 + factor * iqr
+
+
+def rollup_from_sql_result(result):
+    """Turn the query result into the same frame shape DailyRollup produces."""
+    daily = result.copy()
+    daily.index = pd.DatetimeIndex(pd.to_datetime(daily.pop('day'), unit='D'), name='date')
+    for column in ('run_start', 'run_end'):
+        daily[column] = pd.to_datetime(daily[column] * 1e6, unit='us').dt.round('ms')
+    daily['fce'] = daily['soc_discharge'] / 100
+    return daily
+
+
+def query_daily_rollup(connection, table, chassis_number, start_date, end_date, dialect='sqlite',
+                       odometer_bounds=None, max_gap=DEFAULT_MAX_GAP):
+    """Run the pushdown query on an embedded SQLite or DuckDB connection."""
+    params = _range_parameters(chassis_number, start_date, end_date)
+    if odometer_bounds is not None:
+        params['odometer_lower'], params['odometer_upper'] = (float(bound) for bound in odometer_bounds)
+
+    sql = daily_rollup_sql(table, dialect, odometer_bounds is not None, max_gap)
+    return rollup_from_sql_result(_run_query(connection, sql, params, dialect))
+
+
+def query_odometer_bounds(connection, table, chassis_number, start_date, end_date, dialect='sqlite'):
+    """Odometer IQR bounds on an embedded SQLite or DuckDB connection, or None without readings."""
+    sql = odometer_bounds_sql(table, dialect)
+    return bounds_from_sql_result(_run_query(connection, sql, _range_parameters(chassis_number, start_date, end_date), dialect))
+
+
+def _range_parameters(chassis_number, start_date, end_date):
+    return {
+        'chassis_number': chassis_number,
+        'start_date': pd.Timestamp(start_date).strftime('%Y-%m-%d %H:%M:%S'),
+        'end_date': pd.Timestamp(end_date).strftime('%Y-%m-%d %H:%M:%S')
+    }
+
+
+def _run_query(connection, sql, params, dialect):
+    if dialect == 'duckdb':
+        return connection.execute(sql, params).df()
+    return pd.read_sql_query(sql, connection, params=params)
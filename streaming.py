@@ -0,0 +1,48 @@
+import pandas as pd
+
+from daily_rollup import DailyRollup
+from quantile_sketch import iqr_bounds
+
+DEFAULT_BATCH_ROWS = 50000
+
+
+def rollup_from_batches(batches, chassis_number=None, sketch=None):
+    """Fold a chronological stream of Arrow record batches into a DailyRollup table.
+
+    Only one batch is converted to pandas at a time. The rollup carries the
+    last SOC/odometer sample and the still-open day across batches, so
+    memory grows with the number of days rather than the number of rows.
+
+    If a KLLSketch of the chassis's odometer is given (for example one
+    cached from earlier runs) it is updated with each batch, and rows
+    outside its IQR bounds are dropped before they reach the rollup.
+    """
+    rollup = DailyRollup()
+    for batch in batches:
+        df = batch.to_pandas()
+        if chassis_number is not None:
+            df = df[df['chassis_number'] == chassis_number]
+        if df.empty:
+            continue
+        df = df.assign(recorded_at=pd.to_datetime(df['recorded_at']).dt.tz_localize(None))
+        if sketch is not None:
+            lower, upper = iqr_bounds(sketch.update(df['odometer'].values))
+            df = df[df['odometer'].between(lower, upper)]
+        rollup.add(df)
+    return rollup.result()
+
+
+def frame_batches(df, batch_rows=DEFAULT_BATCH_ROWS):
+    """Record batches from an in-memory frame, for testing without BigQuery."""
+    import pyarrow as pa
+
+    table = pa.Table.from_pandas(df.sort_values(by='recorded_at'), preserve_index=False)
+    yield from table.to_batches(max_chunksize=batch_rows)
+
+
+def csv_batches(path, block_size=1 << 22):
+    """Record batches read incrementally from a CSV export sorted by recorded_at."""
+    from pyarrow import csv
+
+    reader = csv.open_csv(path, read_options=csv.ReadOptions(block_size=block_size))
+    yield from reader
@@ -0,0 +1,85 @@
+"""Deterministic synthetic telematics in the schema the dashboard reads.
+
+Each vehicle drives a few trips a day between 06:00 and 22:00, usually
+charges overnight and sometimes tops up at midday. SOC falls with
+distance while driving, rises while charging (saturating at 100%) and
+drifts down slowly while idle. Packet loss drops samples at random, and
+odometer glitches replace readings with zeros or large spikes, which the
+IQR cleaning step is expected to remove.
+"""
+import numpy as np
+import pandas as pd
+
+DAY_SECONDS = 86400
+
+
+def generate_telemetry(chassis_number='SYN00001', start='2024-01-01', days=30, cadence='60s', seed=0,
+                       trips_per_day=4.0, trip_minutes=(15, 90), speed_kmh=(15.0, 35.0),
+                       consumption_per_km=0.6, charge_rate_per_minute=0.35, night_charge_probability=0.9,
+                       top_ups_per_day=0.5, packet_loss=0.0, odometer_glitch_rate=0.0, initial_odometer=1000.0):
+    """Telemetry for one vehicle: chassis_number, recorded_at (UTC), odometer, soc, key_on."""
+    rng = np.random.default_rng(seed)
+    step = pd.Timedelta(cadence).total_seconds()
+    t = np.arange(0, days * DAY_SECONDS, step)
+    n = t.size
+
+    trip_starts, trip_ends = [], []
+    for day in range(days):
+        count = rng.poisson(trips_per_day)
+        starts = np.sort(rng.uniform(6 * 3600, 21 * 3600, count)) + day * DAY_SECONDS
+        durations = rng.uniform(trip_minutes[0], trip_minutes[1], count) * 60
+        trip_starts.append(starts)
+        trip_ends.append(np.minimum(starts + durations, day * DAY_SECONDS + 22 * 3600))
+    key_on = _inside_intervals(t, np.concatenate(trip_starts), np.concatenate(trip_ends))
+
+    day_index = np.arange(days)
+    night_charge = day_index[rng.random(days) < night_charge_probability]
+    top_up_days = np.repeat(day_index, rng.poisson(top_ups_per_day, days))
+    top_up_starts = top_up_days * DAY_SECONDS + rng.uniform(11 * 3600, 16 * 3600, top_up_days.size)
+    charge_starts = np.concatenate([night_charge * DAY_SECONDS + 22.5 * 3600, top_up_starts])
+    charge_ends = np.concatenate([night_charge * DAY_SECONDS + 29 * 3600, top_up_starts + rng.uniform(30, 90, top_up_days.size) * 60])
+    charging = _inside_intervals(t, charge_starts, charge_ends) & ~key_on
+
+    speed = rng.uniform(speed_kmh[0], speed_kmh[1], n)
+    distance = np.where(key_on, speed * step / 3600, 0.0)
+    soc_delta = np.where(key_on, -consumption_per_km * distance, -0.0005 * step / 60)
+    soc_delta = np.where(charging, charge_rate_per_minute * step / 60, soc_delta)
+
+    cumulative = 80.0 + np.cumsum(soc_delta)
+    soc = cumulative - np.maximum(np.maximum.accumulate(cumulative) - 100.0, 0)
+    soc = np.clip(soc, 0, 100)
+
+    df = pd.DataFrame({
+        'chassis_number': chassis_number,
+        'recorded_at': pd.Timestamp(start, tz='UTC') + pd.to_timedelta(t, unit='s'),
+        'odometer': initial_odometer + np.cumsum(distance),
+        'soc': np.round(soc, 1),
+        'key_on': key_on.astype(int)
+    })
+
+    if odometer_glitch_rate:
+        glitched = rng.random(n) < odometer_glitch_rate
+        spikes = np.where(rng.random(n) < 0.5, 0.0, df['odometer'].values * 100)
+        df['odometer'] = np.where(glitched, spikes, df['odometer'].values)
+    if packet_loss:
+        df = df[rng.random(n) >= packet_loss].reset_index(drop=True)
+    return df
+
+
+def generate_fleet(vehicles=10, days=30, seed=0, **kwargs):
+    """Telemetry for several vehicles stacked in one frame, one seed per vehicle."""
+    return pd.concat(
+        [
+            generate_telemetry(chassis_number=f"SYN{index:05d}", days=days, seed=seed + index, **kwargs)
+            for index in range(vehicles)
+        ],
+        ignore_index=True
+    )
+
+
+def _inside_intervals(t, starts, ends):
+    """True where t falls inside any [start, end) interval; intervals may overlap."""
+    edges = np.zeros(t.size + 1, dtype=int)
+    np.add.at(edges, np.searchsorted(t, starts), 1)
+    np.add.at(edges, np.searchsorted(t, ends), -1)
+    return np.cumsum(edges[:-1]) > 0
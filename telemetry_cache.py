@@ -0,0 +1,208 @@
+import os
+import threading
+import time
+import uuid
+from urllib.parse import quote
+
+import pandas as pd
+
+DEFAULT_MAX_BYTES = 2 * 1024 ** 3
+DEFAULT_RECENT_DAYS = 2
+DEFAULT_RECENT_TTL = 15 * 60
+FETCH_FORMAT = '%Y-%m-%d %H:%M:%S'
+
+
+class TelemetryCache:
+    """On-disk Parquet cache of raw telemetry, one file per OEM/chassis/day.
+
+    `fetch` is any callable with the signature of `warehouse.fetch_telemetry`
+    (oem, chassis_number, start_date, end_date) returning a DataFrame with a
+    `recorded_at` column. Only days without a local partition are fetched,
+    in as few contiguous ranges as possible. Days from today onwards are
+    still receiving packets, so they are always fetched and never stored.
+    Late packets still trickle in for the `recent_days` before today, so
+    their partitions, empty or not, are refetched once they are older
+    than `recent_ttl` seconds. Once the cache grows past `max_bytes` the
+    least recently read partitions are deleted.
+
+    Partition sizes, fetch times and read times are kept in an in-memory
+    index, built from one walk of `root` on first use, so cache hits touch
+    only the files they read. Partitions written by other processes are
+    picked up when first requested. Eviction runs only after a write takes
+    the tracked size past `max_bytes`.
+    """
+
+    def __init__(self, root, fetch, max_bytes=DEFAULT_MAX_BYTES, recent_days=DEFAULT_RECENT_DAYS,
+                 recent_ttl=DEFAULT_RECENT_TTL):
+        self.root = root
+        self.fetch = fetch
+        self.max_bytes = max_bytes
+        self.recent_days = recent_days
+        self.recent_ttl = recent_ttl
+        self._lock = threading.Lock()
+        self._index = None
+        self._total_bytes = 0
+
+    def load(self, oem, chassis_number, start_date, end_date):
+        start = pd.Timestamp(start_date)
+        end = pd.Timestamp(end_date)
+        days = pd.date_range(start.normalize(), end.normalize(), freq='D')
+        today = pd.Timestamp.now().normalize()
+
+        with self._lock:
+            cached = [day for day in days if day < today and self._is_fresh(oem, chassis_number, day, today)]
+            for day in cached:
+                self._index[self._partition_path(oem, chassis_number, day)]['read_at'] = time.time()
+
+        # Parquet reads and warehouse queries run unlocked so loads overlap
+        frames = []
+        missing = days.difference(pd.DatetimeIndex(cached))
+        for day in cached:
+            try:
+                frames.append(pd.read_parquet(self._partition_path(oem, chassis_number, day)))
+            except FileNotFoundError:
+                # Evicted or invalidated since the check above
+                missing = missing.union(pd.DatetimeIndex([day]))
+
+        for range_start, range_end in _contiguous_ranges(missing):
+            fetched = self.fetch(
+                oem,
+                chassis_number,
+                range_start.strftime(FETCH_FORMAT),
+                (range_end + pd.Timedelta(days=1) - pd.Timedelta(seconds=1)).strftime(FETCH_FORMAT)
+            )
+            frames.append(fetched)
+            with self._lock:
+                self._write_partitions(oem, chassis_number, fetched, range_start, range_end, today)
+                if self._total_bytes > self.max_bytes:
+                    self._evict()
+
+        frames = [frame for frame in frames if not frame.empty]
+        if not frames:
+            return pd.DataFrame()
+        df = pd.concat(frames, ignore_index=True)
+        recorded_at = pd.to_datetime(df['recorded_at'])
+        tz = recorded_at.dt.tz
+        lower = start.tz_localize(tz) if tz is not None else start
+        upper = end.tz_localize(tz) if tz is not None else end
+        in_range = (recorded_at >= lower) & (recorded_at <= upper)
+        return df[in_range].sort_values(by='recorded_at', ignore_index=True)
+
+    def invalidate(self, oem=None, chassis_number=None, start_date=None, end_date=None):
+        """Delete cached partitions, optionally narrowed to an OEM, chassis and day range."""
+        start = pd.Timestamp(start_date).normalize() if start_date is not None else None
+        end = pd.Timestamp(end_date).normalize() if end_date is not None else None
+        with self._lock:
+            self._load_index()
+            for path, _, _, _ in list(self._partitions()):
+                rel_oem, rel_chassis, filename = os.path.relpath(path, self.root).split(os.sep)
+                day = pd.Timestamp(filename[:-len('.parquet')])
+                if oem is not None and rel_oem != _safe_name(oem):
+                    continue
+                if chassis_number is not None and rel_chassis != _safe_name(chassis_number):
+                    continue
+                if (start is not None and day < start) or (end is not None and day > end):
+                    continue
+                os.remove(path)
+                self._forget(path)
+
+    def size_bytes(self):
+        with self._lock:
+            self._load_index()
+            return self._total_bytes
+
+    def _partition_path(self, oem, chassis_number, day):
+        return os.path.join(self.root, _safe_name(oem), _safe_name(chassis_number), f"{day:%Y-%m-%d}.parquet")
+
+    def _is_fresh(self, oem, chassis_number, day, today):
+        self._load_index()
+        path = self._partition_path(oem, chassis_number, day)
+        entry = self._index.get(path)
+        if entry is None:
+            try:
+                stat = os.stat(path)
+            except FileNotFoundError:
+                return False
+            entry = self._track(path, stat.st_size, stat.st_mtime, stat.st_atime)
+        return day < today - pd.Timedelta(days=self.recent_days) or time.time() - entry['fetched_at'] <= self.recent_ttl
+
+    def _write_partitions(self, oem, chassis_number, df, range_start, range_end, today):
+        self._load_index()
+        if df.empty:
+            by_day = {}
+        else:
+            recorded_at = pd.to_datetime(df['recorded_at'])
+            by_day = dict(tuple(df.groupby(recorded_at.dt.tz_localize(None).dt.normalize())))
+
+        for day in pd.date_range(range_start, range_end, freq='D'):
+            if day >= today:
+                continue
+            path = self._partition_path(oem, chassis_number, day)
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            tmp_path = f"{path}.{uuid.uuid4().hex}.tmp"
+            by_day.get(day, df.iloc[0:0]).to_parquet(tmp_path, index=False)
+            os.replace(tmp_path, path)
+            now = time.time()
+            self._track(path, os.path.getsize(path), now, now)
+
+    def _load_index(self):
+        if self._index is not None:
+            return
+        self._index = {}
+        self._total_bytes = 0
+        for path, size, fetched_at, read_at in self._partitions():
+            self._track(path, size, fetched_at, read_at)
+
+    def _track(self, path, size, fetched_at, read_at):
+        self._forget(path)
+        entry = self._index[path] = {'size': size, 'fetched_at': fetched_at, 'read_at': read_at}
+        self._total_bytes += size
+        return entry
+
+    def _forget(self, path):
+        entry = self._index.pop(path, None)
+        if entry is not None:
+            self._total_bytes -= entry['size']
+
+    def _partitions(self):
+        for dirpath, _, filenames in os.walk(self.root):
+            for filename in filenames:
+                if filename.endswith('.parquet'):
+                    path = os.path.join(dirpath, filename)
+                    stat = os.stat(path)
+                    yield path, stat.st_size, stat.st_mtime, stat.st_atime
+
+    def _evict(self):
+        # Least recently read first; read times of other processes' loads are not seen
+        for path, entry in sorted(self._index.items(), key=lambda item: item[1]['read_at']):
+            if self._total_bytes <= self.max_bytes:
+                break
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+            self._forget(path)
+
+def csv_fetcher(path):
+    """Fetch function backed by a local CSV export instead of BigQuery."""
+    def fetch(oem, chassis_number, start_date, end_date):
+        df = pd.read_csv(path, parse_dates=['recorded_at'])
+        recorded_at = df['recorded_at'].dt.tz_localize(None)
+        return df[
+            (df['chassis_number'] == chassis_number) &
+            (recorded_at >= pd.Timestamp(start_date)) &
+            (recorded_at <= pd.Timestamp(end_date))
+        ].reset_index(drop=True)
+    return fetch
+
+
+def _contiguous_ranges(days):
+    if len(days) == 0:
+        return []
+    breaks = days.to_series().diff() != pd.Timedelta(days=1)
+    run_ids = breaks.cumsum()
+    return [(run.min(), run.max()) for _, run in days.to_series().groupby(run_ids.values)]
+
+
+def _safe_name(value):
+    return quote(str(value), safe='')
@@ -0,0 +1,106 @@
+import json
+import threading
+import urllib.error
+import urllib.request
+
+import numpy as np
+import pytest
+
+from api import InsightsService, make_server
+from synthetic import generate_telemetry
+
+TELEMETRY = generate_telemetry('SYN00001', days=5, cadence='10min')
+QUERY = {'oem': ['Piaggio'], 'start_date': ['2024-01-01'], 'end_date': ['2024-01-05']}
+
+
+class CountingFetch:
+    def __init__(self):
+        self.calls = 0
+
+    def __call__(self, oem, chassis_number, start_date, end_date):
+        self.calls += 1
+        if chassis_number != 'SYN00001':
+            return TELEMETRY.iloc[0:0]
+        return TELEMETRY
+
+
+@pytest.fixture
+def fetch():
+    return CountingFetch()
+
+
+@pytest.fixture
+def service(fetch):
+    return InsightsService(fetch)
+
+
+def test_matching_etag_returns_304(service, fetch):
+    status, headers, body = service.handle('/vehicles/SYN00001/insights', QUERY)
+    assert status == 200
+    assert json.loads(body)['insights']
+
+    status, revalidated, body = service.handle('/vehicles/SYN00001/insights', QUERY, headers['ETag'])
+    assert status == 304
+    assert body == b''
+    assert revalidated['ETag'] == headers['ETag']
+    assert fetch.calls == 1
+
+
+def test_stale_etag_returns_body(service):
+    _, headers, body = service.handle('/vehicles/SYN00001/daily', QUERY)
+
+    status, _, refetched = service.handle('/vehicles/SYN00001/daily', QUERY, '"stale", "other"')
+
+    assert status == 200
+    assert refetched == body
+    assert len(json.loads(body)['daily']) == 5
+
+
+def test_endpoints_share_one_analysis(service, fetch):
+    etags = {service.handle(f'/vehicles/SYN00001/{endpoint}', QUERY)[1]['ETag']
+             for endpoint in ('insights', 'daily', 'narrative')}
+
+    assert len(etags) == 3
+    assert fetch.calls == 1
+
+
+@pytest.mark.parametrize('path, query, status', [
+    ('/vehicles/SYN00001/insights', {'oem': ['Piaggio']}, 400),
+    ('/vehicles/SYN00001/insights', dict(QUERY, start_date=['2024-02-01']), 400),
+    ('/vehicles/SYN00001/unknown', QUERY, 404),
+    ('/vehicles/UNKNOWN/insights', QUERY, 404),
+    ('/health', {}, 200)
+])
+def test_status_codes(service, path, query, status):
+    assert service.handle(path, query)[0] == status
+
+
+def test_server_honours_if_none_match(service):
+    server = make_server(service, port=0, quiet=True)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    url = (f'http://127.0.0.1:{server.server_address[1]}/vehicles/SYN00001/insights'
+           '?oem=Piaggio&start_date=2024-01-01&end_date=2024-01-05')
+    try:
+        with urllib.request.urlopen(url) as response:
+            etag = response.headers['ETag']
+            assert response.status == 200
+        with pytest.raises(urllib.error.HTTPError) as not_modified:
+            urllib.request.urlopen(urllib.request.Request(url, headers={'If-None-Match': etag}))
+        assert not_modified.value.code == 304
+    finally:
+        server.shutdown()
+        server.server_close()
+
+
+def test_non_finite_numbers_are_sent_as_null(service, monkeypatch):
+    def payload(self, endpoint, oem, chassis_number, start, end):
+        return {'insights': {'avg_charge_rate': float('nan'), 'peak': np.float64('inf'), 'days': [1.5, np.nan]}}
+
+    monkeypatch.setattr(InsightsService, '_payload', payload)
+    status, _, body = service.handle('/vehicles/SYN00001/insights', QUERY)
+
+    assert status == 200
+    # parse_constant is only called for NaN and Infinity literals
+    insights = json.loads(body, parse_constant=pytest.fail)['insights']
+    assert insights == {'avg_charge_rate': None, 'peak': None, 'days': [1.5, None]}
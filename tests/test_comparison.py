@@ -0,0 +1,70 @@
+import threading
+import time
+
+from comparison import compare_vehicles, comparison_table, parse_chassis_numbers
+from memo import ResultCache
+from synthetic import generate_telemetry
+
+VEHICLES = {chassis: generate_telemetry(chassis, days=5, cadence='10min', seed=seed)
+            for seed, chassis in enumerate(['SYN00001', 'SYN00002', 'SYN00003', 'SYN00004'])}
+START, END = '2024-01-01 00:00:00', '2024-01-05 23:59:59'
+
+
+def analyzer(fetch):
+    # The dashboard's analyzer: fetch, clean and roll up through a ResultCache
+    results = ResultCache(fetch)
+    return lambda *request: results.analysis(*request)[0]
+
+
+class SlowFetch:
+    """Stands in for a warehouse query: sleeps with the GIL released and counts overlapping calls."""
+
+    def __init__(self, delay=0.2):
+        self.delay = delay
+        self.active = 0
+        self.peak = 0
+        self._lock = threading.Lock()
+
+    def __call__(self, oem, chassis_number, start_date, end_date):
+        with self._lock:
+            self.active += 1
+            self.peak = max(self.peak, self.active)
+        try:
+            time.sleep(self.delay)
+            if chassis_number not in VEHICLES:
+                return VEHICLES['SYN00001'].iloc[0:0]
+            return VEHICLES[chassis_number]
+        finally:
+            with self._lock:
+                self.active -= 1
+
+
+def test_vehicles_are_fetched_concurrently():
+    fetch = SlowFetch()
+    started = time.perf_counter()
+    comparison = compare_vehicles('Piaggio', list(VEHICLES), START, END, analyzer(fetch))
+    elapsed = time.perf_counter() - started
+
+    assert fetch.peak == len(VEHICLES)
+    assert elapsed < len(VEHICLES) * fetch.delay
+    assert list(comparison.analyses) == list(VEHICLES)
+    assert comparison.errors == {}
+
+
+def test_failures_are_collected_per_vehicle():
+    def analyze(oem, chassis_number, start_date, end_date):
+        if chassis_number == 'BROKEN':
+            raise RuntimeError("query failed")
+        return analyzer(SlowFetch(0))(oem, chassis_number, start_date, end_date)
+
+    comparison = compare_vehicles('Piaggio', ['SYN00001', 'BROKEN', 'MISSING'], START, END, analyze)
+
+    assert list(comparison.analyses) == ['SYN00001']
+    assert comparison.errors['BROKEN'] == 'RuntimeError: query failed'
+    assert comparison.errors['MISSING'] == 'no data for the selected date range'
+    assert list(comparison_table(comparison).index) == ['SYN00001']
+
+
+def test_parse_chassis_numbers_keeps_input_order_without_duplicates():
+    assert parse_chassis_numbers("B, A\nC A  B") == ['B', 'A', 'C']
+    assert parse_chassis_numbers("  ") == []
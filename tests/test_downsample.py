@@ -0,0 +1,57 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from downsample import bar_buckets, lttb_indices, minmax_indices, time_series_trace
+
+
+def test_lttb_keeps_endpoints_and_extremes():
+    y = np.zeros(10)
+    y[2], y[6] = -50, 100
+
+    assert list(lttb_indices(np.arange(10), y, 4)) == [0, 2, 6, 9]
+
+
+def test_lttb_accepts_datetimes():
+    x = pd.date_range('2024-01-01', periods=10, freq='min').values
+    y = np.zeros(10)
+    y[6] = 100
+
+    assert list(lttb_indices(x, y, 4)) == list(lttb_indices(np.arange(10), y, 4))
+
+
+def test_minmax_keeps_each_buckets_lowest_and_highest_point():
+    # Buckets are [3, 1, 4, 1] and [5, 9, 2, 6]; ties keep the first position
+    assert list(minmax_indices([3, 1, 4, 1, 5, 9, 2, 6], 2)) == [1, 2, 5, 6]
+
+
+def test_short_series_are_not_downsampled():
+    assert list(lttb_indices(np.arange(5), np.arange(5), 5)) == [0, 1, 2, 3, 4]
+    assert list(minmax_indices([1, 2, 3, 4], 2)) == [0, 1, 2, 3]
+
+
+def test_trace_drops_nan_and_keeps_customdata_aligned():
+    y = np.array([1, np.nan, 5, 2, 8, 3])
+    customdata = np.array(['a', 'b', 'c', 'd', 'e', 'f'])
+
+    trace = time_series_trace(np.arange(6), y, width_px=4, method='minmax', customdata=customdata)
+
+    # After dropping the NaN the buckets are [1, 5, 2] and [8, 3]
+    assert list(trace.x) == [0, 2, 4, 5]
+    assert list(trace.y) == [1, 5, 8, 3]
+    assert list(trace.customdata) == ['a', 'c', 'e', 'f']
+
+
+def test_trace_rejects_unknown_method():
+    with pytest.raises(ValueError):
+        time_series_trace(np.arange(10), np.arange(10), width_px=4, method='mean')
+
+
+def test_bar_buckets_group_days_into_equal_bars():
+    dates = pd.date_range('2024-01-01', periods=10, freq='D')
+
+    bars = bar_buckets(dates, width_px=4)
+
+    assert list(bars.strftime('%d')) == ['01'] * 3 + ['04'] * 3 + ['07'] * 3 + ['10']
+    assert bar_buckets(dates, width_px=10).equals(dates)
+    assert bar_buckets([], width_px=4).empty
@@ -0,0 +1,95 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from daily_rollup import DailyRollup
+from fce import segment_fce_cycles
+from figures import CYCLE_COLORS
+
+
+def loop_daily_fce(df_clean):
+    """The dashboard's original per-row loop."""
+    df_clean = df_clean.copy()
+    df_clean['date'] = df_clean['recorded_at'].dt.date
+    df_clean = df_clean.sort_values(by='recorded_at')
+
+    fce_per_day = {}
+    distance_per_day = {}
+    for day, day_data in df_clean.groupby('date'):
+        daily_discharge = 0
+        daily_distance = 0
+        for i in range(1, len(day_data)):
+            prev_row = day_data.iloc[i - 1]
+            curr_row = day_data.iloc[i]
+            daily_discharge += max(0, prev_row['soc'] - curr_row['soc'])
+            daily_distance += max(0, curr_row['odometer'] - prev_row['odometer'])
+        fce_per_day[day] = daily_discharge / 100
+        distance_per_day[day] = daily_distance
+
+    summary_df = pd.DataFrame({
+        'Date': list(fce_per_day.keys()),
+        'Cumulative FCE': list(fce_per_day.values()),
+        'Distance Covered (km)': list(distance_per_day.values())
+    })
+    summary_df['Date'] = pd.to_datetime(summary_df['Date'])
+    return summary_df
+
+
+def loop_segments(fce_values):
+    """The dashboard's original cycle segmentation: (day position, size, colour) per bar."""
+    cumulative_fce = 0
+    cycle_index = 0
+    bar_segments = []
+    for idx, fce in enumerate(fce_values):
+        while fce > 0:
+            if cumulative_fce + fce < 1:
+                bar_segments.append((idx, fce, CYCLE_COLORS[cycle_index]))
+                cumulative_fce += fce
+                fce = 0
+            else:
+                first_part = 1 - cumulative_fce
+                bar_segments.append((idx, first_part, CYCLE_COLORS[cycle_index]))
+                fce -= first_part
+                cycle_index = (cycle_index + 1) % len(CYCLE_COLORS)
+                cumulative_fce = 0
+    return bar_segments
+
+
+def telemetry(seed, days=6, freq='7min'):
+    rng = np.random.default_rng(seed)
+    recorded_at = pd.date_range('2024-01-01', periods=days * 24 * 60 // 7, freq=freq)
+    n = len(recorded_at)
+    df = pd.DataFrame({
+        'recorded_at': recorded_at,
+        'soc': np.clip(60 + rng.normal(0, 3, n).cumsum(), 0, 100),
+        'odometer': 1000 + np.cumsum(rng.random(n)) + rng.normal(0, 0.05, n),
+        'key_on': rng.integers(0, 2, n)
+    })
+    return df.sample(frac=1, random_state=seed).reset_index(drop=True)
+
+
+@pytest.mark.parametrize('seed', [0, 1, 2, 3])
+def test_daily_rollup_fce_matches_per_row_loop(seed):
+    df = telemetry(seed)
+    expected = loop_daily_fce(df)
+    daily = DailyRollup.from_frame(df)
+
+    assert list(daily.index) == list(expected['Date'])
+    assert np.allclose(daily['fce'].values, expected['Cumulative FCE'])
+    assert np.allclose(daily['distance_positive'].values, expected['Distance Covered (km)'])
+
+
+@pytest.mark.parametrize('fce_values', [
+    [0.3, 0.5, 0.4, 1.7, 0.0, 2.25, 0.1],
+    [1.0, 1.0, 0.5],
+    [],
+    list(np.random.default_rng(4).gamma(1.0, 0.6, 60))
+])
+def test_segment_fce_cycles_matches_loop(fce_values):
+    expected = loop_segments(fce_values)
+    day_positions, sizes, cycles = segment_fce_cycles(fce_values)
+
+    assert len(day_positions) == len(expected)
+    assert list(day_positions) == [idx for idx, _, _ in expected]
+    assert np.allclose(sizes, [size for _, size, _ in expected])
+    assert [CYCLE_COLORS[cycle % len(CYCLE_COLORS)] for cycle in cycles] == [color for _, _, color in expected]
@@ -0,0 +1,62 @@
+import numpy as np
+import pandas as pd
+
+from fleet_matrix import (FleetMatrix, anomaly_flags, cohort_percentiles, fleet_summary, percentile_ranks,
+                          rolling_zscores)
+
+
+def fleet(rows):
+    """A FleetMatrix from {(oem, chassis_number): daily distances}, None for days not reported."""
+    frame = pd.DataFrame([
+        {'oem': oem, 'chassis_number': chassis, 'date': pd.Timestamp('2024-01-01') + pd.Timedelta(days=day),
+         'distance': value, 'fce': 0.0, 'soc_charge': 0.0}
+        for (oem, chassis), values in rows.items() for day, value in enumerate(values) if value is not None
+    ])
+    return FleetMatrix.from_long(frame)
+
+
+FLEET = fleet({
+    ('A', 'V1'): [10, 20, 30],
+    ('A', 'V2'): [20, None, 50],
+    ('A', 'V3'): [30, 40, 10],
+    ('B', 'V4'): [5, 5, 5]
+})
+
+
+def test_from_long_masks_unreported_days():
+    assert list(FLEET.chassis_numbers) == ['V1', 'V2', 'V3', 'V4']
+    assert FLEET.mask.sum() == 11
+    assert np.isnan(FLEET.values['distance'][1, 1])
+
+
+def test_cohort_percentiles_use_vehicles_reporting_each_day():
+    bands = cohort_percentiles(FLEET, 'distance', (25, 50))
+
+    assert bands['A'].tolist() == [[15, 25, 20], [20, 30, 30]]
+    assert bands['B'].tolist() == [[5, 5, 5], [5, 5, 5]]
+
+
+def test_percentile_ranks_within_oem():
+    # Cohort A means are 20, 35 and 26.7; V4 has no peers
+    ranks = percentile_ranks(FLEET, 'distance')
+
+    assert ranks[:3].tolist() == [0, 100, 50]
+    assert np.isnan(ranks[3])
+
+
+def test_rolling_zscores_exclude_the_current_day():
+    single = fleet({('A', 'V1'): [1, 2, 3, 4, 10]})
+
+    z = rolling_zscores(single, 'distance', window=3, min_periods=2)[0]
+
+    assert np.isnan(z[:2]).all()
+    assert np.allclose(z[2:], [1.5 / np.sqrt(0.5), 2, 7])
+    assert anomaly_flags(z, threshold=3).tolist() == [0, 0, 0, 0, 1]
+
+
+def test_fleet_summary_counts_days_outside_the_cohort_quartiles():
+    summary = fleet_summary(FLEET)
+
+    assert summary.loc['V1', ['days', 'days_below_p25', 'days_above_p75']].tolist() == [3, 2, 0]
+    assert summary.loc['V2', ['days', 'cohort_size']].tolist() == [2, 3]
+    assert summary.loc['V3', 'days_above_p75'] == 2
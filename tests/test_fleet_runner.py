@@ -0,0 +1,74 @@
+import os
+
+import pandas as pd
+
+import fleet_runner
+from synthetic import generate_telemetry
+
+VEHICLES = [('Piaggio', chassis, '2024-01-01', '2024-01-03') for chassis in ('SYN00001', 'SYN00002', 'CRASH', 'SYN00003')]
+
+
+def telemetry_csv(tmp_path):
+    path = tmp_path / 'telemetry.csv'
+    pd.concat([generate_telemetry(chassis, days=3, cadence='10min', seed=seed)
+               for seed, chassis in enumerate(['SYN00001', 'SYN00002', 'SYN00003'])]).to_csv(path, index=False)
+    return str(path)
+
+
+def dying_chunk(vehicles, *args):
+    if any(chassis_number == 'CRASH' for _, chassis_number, _, _ in vehicles):
+        os._exit(1)
+    return RUN_CHUNK(vehicles, *args)
+
+
+RUN_CHUNK = fleet_runner.run_chunk
+
+
+def test_dead_worker_fails_its_chunk_and_the_run_continues(tmp_path, monkeypatch):
+    monkeypatch.setattr(fleet_runner, 'run_chunk', dying_chunk)
+    csv_path = telemetry_csv(tmp_path)
+
+    results = fleet_runner.run_fleet(VEHICLES, workers=1, chunk_size=1, csv_path=csv_path).set_index('chassis_number')
+
+    assert sorted(results.index) == sorted(chassis for _, chassis, _, _ in VEHICLES)
+    assert results.loc['CRASH', 'error'].startswith('BrokenProcessPool')
+    # SYN00003 was in flight when the worker died; it is rerun on a fresh pool
+    assert pd.isna(results.loc['SYN00003', 'error'])
+
+
+def test_setup_failure_is_recorded_per_vehicle(monkeypatch):
+    def broken_fetch(csv_path, cache_dir):
+        raise OSError("cache directory is read-only")
+
+    monkeypatch.setattr(fleet_runner, 'make_fetch', broken_fetch)
+
+    records = fleet_runner.run_chunk(VEHICLES[:2])
+
+    assert [record['chassis_number'] for record in records] == ['SYN00001', 'SYN00002']
+    assert all(record['error'] == 'OSError: cache directory is read-only' for record in records)
+
+
+def test_failures_are_recorded_without_stopping(tmp_path):
+    results = fleet_runner.run_chunk(VEHICLES, telemetry_csv(tmp_path))
+
+    errors = {record['chassis_number']: record['error'] for record in results}
+    assert errors['CRASH'].startswith('ValueError')
+    assert [chassis for chassis, error in errors.items() if error is None] == ['SYN00001', 'SYN00002', 'SYN00003']
+
+
+def test_rollup_store_is_filled_from_the_loaded_packets(tmp_path):
+    from rollup_store import RollupStore
+
+    telemetry = generate_telemetry('SYN00001', days=3, cadence='10min')
+    calls = []
+
+    def fetch(oem, chassis_number, start_date, end_date):
+        calls.append((start_date, end_date))
+        return telemetry
+
+    store = RollupStore(str(tmp_path / 'rollups.sqlite'))
+    fleet_runner.run_vehicle(fetch, 'Piaggio', 'SYN00001', '2024-01-01', '2024-01-03 23:59:59', store)
+
+    assert calls == [('2024-01-01 00:00:00', '2024-01-03 23:59:59')]
+    assert store.watermark('Piaggio', 'SYN00001')['completed_through'] == pd.Timestamp('2024-01-03')
+    assert len(store.daily('Piaggio', 'SYN00001', '2024-01-01', '2024-01-03')) == 3
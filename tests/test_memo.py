@@ -0,0 +1,39 @@
+import pandas as pd
+
+from memo import ResultCache
+from synthetic import generate_telemetry
+
+
+def test_empty_fetch_gives_empty_analysis():
+    cache = ResultCache(lambda oem, chassis_number, start_date, end_date: pd.DataFrame())
+
+    analysis, _, _ = cache.analysis('Piaggio', 'NODATA', '2024-01-01 00:00:00', '2024-01-31 00:00:00')
+
+    assert analysis.vehicle_date_range is None
+    assert analysis.filtered.empty
+    assert analysis.insights is None
+
+
+def test_repeat_and_narrower_requests_are_served_from_memory():
+    telemetry = generate_telemetry('SYN00001', days=5)
+    calls = []
+
+    def fetch(oem, chassis_number, start_date, end_date):
+        calls.append((start_date, end_date))
+        return telemetry
+
+    cache = ResultCache(fetch)
+    first, _, _ = cache.analysis('Piaggio', 'SYN00001', '2024-01-01 00:00:00', '2024-01-05 23:59:59')
+    again, _, _ = cache.analysis('Piaggio', 'SYN00001', '2024-01-01 00:00:00', '2024-01-05 23:59:59')
+    narrower, _, _ = cache.analysis('Piaggio', 'SYN00001', '2024-01-02 00:00:00', '2024-01-03 23:59:59')
+
+    assert len(calls) == 1
+    assert again.daily is first.daily
+    assert len(narrower.daily) == 2
+
+
+def test_code_version_covers_imported_modules():
+    from memo import CODE_MODULES
+
+    for module in ('pipeline', 'sessions', 'downsample', 'schema', 'figures', 'running_hours', 'daily_rollup'):
+        assert module in CODE_MODULES
@@ -0,0 +1,59 @@
+import numpy as np
+import pandas as pd
+
+from quantile_sketch import KLLSketch, iqr_bounds, iqr_mask
+
+QS = np.array([0.01, 0.25, 0.5, 0.75, 0.99])
+
+
+def rank_errors(sketch, n):
+    # Values are a permutation of 0..n-1, so a value's rank is the value itself
+    return np.abs(sketch.quantiles(QS) - QS * n) / n
+
+
+def test_rank_error_stays_within_the_bound():
+    n = 200_000
+    values = np.random.default_rng(0).permutation(n).astype(float)
+    sketch = KLLSketch(k=200)
+    for chunk in np.array_split(values, 50):
+        sketch.update(chunk)
+
+    assert len(sketch) == n
+    assert rank_errors(sketch, n).max() <= 1.7 / 200
+    assert sum(len(items) for items in sketch.levels) < 2000
+
+
+def test_merged_sketches_match_one_sketch_over_everything():
+    n = 100_000
+    values = np.random.default_rng(1).permutation(n).astype(float)
+    merged = KLLSketch(k=200, seed=1).update(values[:30_000])
+    merged.merge(KLLSketch(k=200, seed=2).update(values[30_000:]))
+
+    assert len(merged) == n
+    assert rank_errors(merged, n).max() <= 1.7 / 200
+
+
+def test_json_round_trip_keeps_state():
+    sketch = KLLSketch(k=50, seed=3).update(np.arange(10_000.0))
+    restored = KLLSketch.from_json(sketch.to_json())
+
+    assert (restored.k, restored.seed, len(restored)) == (50, 3, 10_000)
+    np.testing.assert_array_equal(restored.quantiles(QS), sketch.quantiles(QS))
+    # Compaction is seeded by n, so both keep evolving identically
+    restored.update(np.arange(500.0))
+    sketch.update(np.arange(500.0))
+    np.testing.assert_array_equal(restored.quantiles(QS), sketch.quantiles(QS))
+
+
+def test_small_inputs_are_exact_and_nan_is_ignored():
+    sketch = KLLSketch().update(np.r_[np.arange(1.0, 101.0), np.nan])
+
+    assert len(sketch) == 100
+    assert iqr_bounds(sketch) == (25 - 1.5 * 50, 75 + 1.5 * 50)
+    assert np.isnan(KLLSketch().quantiles([0.5])).all()
+
+
+def test_iqr_mask_drops_glitched_readings():
+    df = pd.DataFrame({'odometer': np.r_[np.arange(1000.0, 1100.0), 1e7, -5.0]})
+
+    assert list(df.index[~iqr_mask(df)]) == [100, 101]
@@ -0,0 +1,56 @@
+import pandas as pd
+import pytest
+
+from rollup_store import RollupStore
+from synthetic import generate_telemetry
+
+TELEMETRY = generate_telemetry('SYN00001', days=6, cadence='10min')
+
+
+def fetch(oem, chassis_number, start_date, end_date):
+    recorded_at = TELEMETRY['recorded_at'].dt.tz_localize(None)
+    return TELEMETRY[(recorded_at >= pd.Timestamp(start_date)) & (recorded_at <= pd.Timestamp(end_date))]
+
+
+@pytest.fixture
+def store(tmp_path):
+    return RollupStore(str(tmp_path / 'rollups.sqlite'))
+
+
+def test_revision_changes_with_every_write(store):
+    revisions = [store.revision()]
+    store.refresh('Piaggio', 'SYN00001', fetch, '2024-01-01', '2024-01-04')
+    revisions.append(store.revision())
+    assert store.refresh('Piaggio', 'SYN00001', fetch, '2024-01-01', '2024-01-04') == 0
+    revisions.append(store.revision())
+    store.invalidate('Piaggio')
+    revisions.append(store.revision())
+
+    assert revisions[0] < revisions[1] == revisions[2] < revisions[3]
+
+
+def test_refresh_recomputes_the_lookback_window(store, tmp_path):
+    recorded_at = TELEMETRY['recorded_at'].dt.tz_localize(None)
+    late = (recorded_at >= pd.Timestamp('2024-01-03 18:00')) & (recorded_at < pd.Timestamp('2024-01-04'))
+    arrived = TELEMETRY[~late]
+
+    def partial_fetch(oem, chassis_number, start_date, end_date):
+        in_range = arrived['recorded_at'].dt.tz_localize(None).between(pd.Timestamp(start_date), pd.Timestamp(end_date))
+        return arrived[in_range]
+
+    store.refresh('Piaggio', 'SYN00001', partial_fetch, '2024-01-01', '2024-01-04')
+    # The evening packets of 2024-01-03 arrive after the day was folded
+    assert store.refresh('Piaggio', 'SYN00001', fetch, '2024-01-01', '2024-01-06') == 4
+
+    complete = RollupStore(str(tmp_path / 'complete.sqlite'))
+    complete.refresh('Piaggio', 'SYN00001', fetch, '2024-01-01', '2024-01-06')
+    pd.testing.assert_frame_equal(store.daily('Piaggio', 'SYN00001', '2024-01-01', '2024-01-05'),
+                                  complete.daily('Piaggio', 'SYN00001', '2024-01-01', '2024-01-05'))
+    assert store.watermark('Piaggio', 'SYN00001')['last_sample'] == complete.watermark('Piaggio', 'SYN00001')['last_sample']
+
+
+def test_refresh_without_lookback_only_folds_new_days(store):
+    store.refresh('Piaggio', 'SYN00001', fetch, '2024-01-01', '2024-01-04')
+
+    assert store.refresh('Piaggio', 'SYN00001', fetch, '2024-01-01', '2024-01-06', lookback_days=0) == 2
+    assert len(store.daily('Piaggio', 'SYN00001', '2024-01-01', '2024-01-05')) == 5
@@ -0,0 +1,56 @@
+import pandas as pd
+import pytest
+
+from running_hours import daily_running_hours
+
+
+def samples(*rows):
+    df = pd.DataFrame(rows, columns=['recorded_at', 'key_on'])
+    df['recorded_at'] = pd.to_datetime(df['recorded_at'])
+    return df
+
+
+def minutes(hours):
+    return round(hours * 60, 6)
+
+
+def test_intervals_are_split_at_noon_and_midnight():
+    df = samples(
+        ('2024-01-01 11:58', 1), ('2024-01-01 12:02', 0),
+        ('2024-01-01 23:59', 1), ('2024-01-02 00:01', 0)
+    )
+
+    hours = daily_running_hours(df).set_index('Date')
+
+    assert minutes(hours.loc['2024-01-01', 'Nighttime Hours']) == 2
+    assert minutes(hours.loc['2024-01-01', 'Daytime Hours']) == 2 + 1
+    assert minutes(hours.loc['2024-01-02', 'Nighttime Hours']) == 1
+    assert minutes(hours.loc['2024-01-02', 'Daytime Hours']) == 0
+
+
+def test_gaps_are_capped_and_key_off_samples_do_not_count():
+    df = samples(
+        ('2024-01-01 06:00', 1), ('2024-01-01 07:00', 1),
+        ('2024-01-01 07:03', 0), ('2024-01-01 08:00', 1)
+    )
+
+    hours = daily_running_hours(df, max_gap='5min').set_index('Date')
+
+    # 06:00 gets the 5-minute cap, 07:00 its 3 minutes, and the last sample nothing
+    assert minutes(hours.loc['2024-01-01', 'Nighttime Hours']) == 5 + 3
+    assert hours.loc['2024-01-01', 'Running Time Range'] == '06:00 - 08:00'
+
+
+def test_unsorted_input_matches_sorted():
+    df = samples(('2024-01-01 13:00', 1), ('2024-01-01 12:57', 1), ('2024-01-01 13:04', 0))
+
+    assert minutes(daily_running_hours(df).loc[0, 'Daytime Hours']) == 3 + 4
+
+
+def test_without_key_on_samples():
+    assert daily_running_hours(samples(('2024-01-01 06:00', 0))).empty
+
+
+def test_max_gap_beyond_half_a_day_is_rejected():
+    with pytest.raises(ValueError):
+        daily_running_hours(samples(('2024-01-01 06:00', 1)), max_gap='13h')
@@ -0,0 +1,46 @@
+import numpy as np
+import pandas as pd
+
+from schema import date_slice, normalize_telemetry
+
+
+def nullable_frame():
+    """Telemetry as BigQuery returns NULLable INTEGER and FLOAT columns."""
+    return pd.DataFrame({
+        'chassis_number': ['A', 'A', 'B', 'A', 'B'],
+        'recorded_at': pd.to_datetime([
+            '2024-01-01 00:03', '2024-01-01 00:01', '2024-01-01 00:00', '2024-01-01 00:02', '2024-01-01 00:04'
+        ]).tz_localize('UTC'),
+        'odometer': pd.array([10.0, None, 5.0, 11.0, 6.0], dtype='Float64'),
+        'soc': pd.array([50.0, 51.0, None, 49.5, 60.0], dtype='Float64'),
+        'key_on': pd.array([None, 1, None, None, 1], dtype='Int64')
+    })
+
+
+def test_normalize_accepts_nullable_columns():
+    df = normalize_telemetry(nullable_frame())
+
+    assert df['key_on'].dtype == np.uint8
+    assert df['soc'].dtype == np.float32
+    assert df['odometer'].dtype == np.float64
+    assert df['recorded_at'].is_monotonic_increasing
+    assert df['recorded_at'].dt.tz is None
+    assert df['odometer'].isna().sum() == 1
+    assert df['soc'].isna().sum() == 1
+
+
+def test_null_key_on_keeps_previous_state_per_chassis():
+    df = normalize_telemetry(nullable_frame())
+
+    a = df[df['chassis_number'] == 'A']
+    b = df[df['chassis_number'] == 'B']
+    # A: 00:01 on, 00:02 NULL, 00:03 NULL -> both follow the key-on sample
+    assert a['key_on'].tolist() == [1, 1, 1]
+    # B: 00:00 NULL with nothing before it counts as key off
+    assert b['key_on'].tolist() == [0, 1]
+
+
+def test_date_slice_is_inclusive():
+    df = normalize_telemetry(nullable_frame())
+    sliced = date_slice(df, '2024-01-01 00:01', '2024-01-01 00:03')
+    assert len(sliced) == 3
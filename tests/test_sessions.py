@@ -0,0 +1,74 @@
+import pandas as pd
+
+from sessions import daily_session_totals, sessionize
+
+
+def minutes(*rows):
+    """Samples from (minute, key_on, soc, odometer) tuples."""
+    df = pd.DataFrame(rows, columns=['minute', 'key_on', 'soc', 'odometer'])
+    df['recorded_at'] = pd.Timestamp('2024-01-01') + pd.to_timedelta(df.pop('minute'), unit='min')
+    return df
+
+
+# Idle, a three-minute trip, a charge with one flat sample, then a trip after a 22-minute gap
+TELEMETRY = minutes(
+    (0, 0, 50, 0),
+    (1, 1, 48, 1), (2, 1, 46, 2), (3, 1, 44, 3),
+    (4, 0, 44, 3),
+    (5, 0, 46, 3), (6, 0, 48, 3), (7, 0, 48, 3), (8, 0, 50, 3),
+    (30, 1, 50, 3), (31, 1, 49, 4)
+)
+
+
+def test_runs_become_sessions_that_tile_time():
+    sessions = sessionize(TELEMETRY)
+
+    trips = sessions.trips
+    assert list(trips['start'].dt.strftime('%H:%M')) == ['00:00', '00:30']
+    assert list(trips['end'].dt.strftime('%H:%M')) == ['00:03', '00:31']
+    assert list(trips['distance']) == [3, 1]
+    assert list(trips['soc_used']) == [6, 1]
+    assert list(trips['samples']) == [3, 2]
+
+    charging = sessions.charging.iloc[0]
+    assert len(sessions.charging) == 1
+    assert charging['start'] == pd.Timestamp('2024-01-01 00:04')
+    assert charging['end'] == pd.Timestamp('2024-01-01 00:08')
+    assert (charging['soc_gained'], charging['samples']) == (6, 4)
+    assert charging['rate_per_hour'] == 90
+
+    assert list(sessions.idle['start'].dt.strftime('%H:%M')) == ['00:00', '00:03']
+    assert list(sessions.idle['samples']) == [1, 1]
+
+
+def test_gap_ends_a_session_and_its_delta_is_ignored():
+    sessions = sessionize(minutes((0, 1, 80, 0), (1, 1, 79, 1), (40, 1, 60, 30), (41, 1, 59, 31)))
+
+    assert len(sessions.trips) == 2
+    assert list(sessions.trips['distance']) == [1, 1]
+    assert sessions.trips['duration_hours'].sum() * 60 == 2
+
+
+def test_flat_samples_beyond_trend_hold_end_a_charge():
+    df = minutes((0, 0, 40, 0), (1, 0, 42, 0), (5, 0, 42, 0), (14, 0, 42, 0), (15, 0, 44, 0))
+
+    charging = sessionize(df, trend_hold='10min').charging
+
+    # 00:14 is 13 minutes after the last rise, so it is idle and splits the charge
+    assert list(charging['end'].dt.strftime('%H:%M')) == ['00:05', '00:15']
+
+
+def test_small_charges_are_idle():
+    sessions = sessionize(minutes((0, 0, 50, 0), (1, 0, 50.5, 0), (2, 0, 50.5, 0)), soc_noise=0.1, min_charge=1.0)
+
+    assert sessions.charging.empty
+    assert len(sessions.idle) == 1
+    assert sessions.idle.loc[0, 'soc_change'] == 0.5
+
+
+def test_daily_totals_count_sessions_on_their_start_day():
+    totals = daily_session_totals(sessionize(TELEMETRY), pd.DatetimeIndex(['2024-01-01', '2024-01-02']))
+
+    assert list(totals['trips']) == [2, 0]
+    assert list(totals['charging_sessions']) == [1, 0]
+    assert list(totals['soc_charged']) == [6, 0]
@@ -0,0 +1,109 @@
+import sqlite3
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from daily_rollup import DailyRollup
+from running_hours import daily_running_hours
+from sql_pushdown import daily_rollup_sql, odometer_bounds_sql, query_daily_rollup, query_odometer_bounds
+
+
+@pytest.fixture(scope='module')
+def telemetry():
+    rng = np.random.default_rng(0)
+    n = 30000
+    df = pd.DataFrame({
+        'chassis_number': 'C',
+        'recorded_at': pd.date_range('2024-01-01', periods=n, freq='37s'),
+        'soc': np.clip(50 + rng.normal(0, 2, n).cumsum(), 0, 100),
+        'odometer': np.cumsum(rng.random(n)),
+        'key_on': rng.integers(0, 2, n)
+    })
+    # Packet loss leaves gaps, some longer than the running-hours cutoff
+    return df.drop(index=rng.choice(n, 3000, replace=False)).reset_index(drop=True)
+
+
+def assert_matches_pandas(pushed, df):
+    expected = DailyRollup.from_frame(df)
+    hours = daily_running_hours(df).set_index('Date').reindex(expected.index).fillna(0)
+
+    assert list(pushed.index) == list(expected.index)
+    for column in expected.columns:
+        if column in ('run_start', 'run_end'):
+            assert (pushed[column] == expected[column]).all(), column
+        else:
+            assert np.allclose(pushed[column].astype(float), expected[column].astype(float)), column
+    assert np.allclose(pushed['daytime_hours'], hours['Daytime Hours'])
+    assert np.allclose(pushed['nighttime_hours'], hours['Nighttime Hours'])
+
+
+def test_sqlite_rollup_matches_pandas(telemetry):
+    connection = sqlite3.connect(':memory:')
+    telemetry.to_sql('telemetry', connection, index=False)
+
+    pushed = query_daily_rollup(connection, 'telemetry', 'C', '2024-01-01', '2024-02-01')
+
+    assert_matches_pandas(pushed, telemetry)
+
+
+def test_duckdb_rollup_matches_pandas(telemetry):
+    duckdb = pytest.importorskip('duckdb')
+    connection = duckdb.connect()
+    connection.register('frame', telemetry)
+    connection.execute('CREATE TABLE telemetry AS SELECT * FROM frame')
+
+    pushed = query_daily_rollup(connection, 'telemetry', 'C', '2024-01-01', '2024-02-01', dialect='duckdb')
+
+    assert_matches_pandas(pushed, telemetry)
+
+
+def test_odometer_bounds_filter_rows(telemetry):
+    connection = sqlite3.connect(':memory:')
+    telemetry.to_sql('telemetry', connection, index=False)
+    bounds = (100, 5000)
+
+    pushed = query_daily_rollup(connection, 'telemetry', 'C', '2024-01-01', '2024-02-01', odometer_bounds=bounds)
+
+    assert_matches_pandas(pushed, telemetry[telemetry['odometer'].between(*bounds)].reset_index(drop=True))
+
+
+def iqr_bounds(values):
+    q1, q3 = np.percentile(values, [25, 75])
+    return q1 - 1.5 * (q3 - q1), q3 + 1.5 * (q3 - q1)
+
+
+@pytest.mark.parametrize('dialect', ['sqlite', 'duckdb'])
+def test_odometer_bounds_drop_glitches(telemetry, dialect):
+    glitched = telemetry.copy()
+    glitched.loc[::997, 'odometer'] = 999999.0
+    if dialect == 'duckdb':
+        connection = pytest.importorskip('duckdb').connect()
+        connection.register('frame', glitched)
+        connection.execute('CREATE TABLE telemetry AS SELECT * FROM frame')
+    else:
+        connection = sqlite3.connect(':memory:')
+        glitched.to_sql('telemetry', connection, index=False)
+
+    bounds = query_odometer_bounds(connection, 'telemetry', 'C', '2024-01-01', '2024-02-01', dialect)
+    pushed = query_daily_rollup(connection, 'telemetry', 'C', '2024-01-01', '2024-02-01', dialect, bounds)
+
+    assert np.allclose(bounds, iqr_bounds(glitched['odometer']), rtol=1e-3)
+    assert_matches_pandas(pushed, glitched[glitched['odometer'].between(*bounds)].reset_index(drop=True))
+    assert pushed['distance'].max() < 10000
+
+
+def test_odometer_bounds_without_readings():
+    connection = sqlite3.connect(':memory:')
+    pd.DataFrame({'chassis_number': ['C'], 'recorded_at': ['2024-01-01 00:00:00'], 'odometer': [1.0]}).to_sql(
+        'telemetry', connection, index=False)
+
+    assert query_odometer_bounds(connection, 'telemetry', 'OTHER', '2024-01-01', '2024-02-01') is None
+
+
+def test_bigquery_sql_uses_named_parameters():
+    sql = daily_rollup_sql('proj.dataset.telemetry', 'bigquery', odometer_bounds=True)
+
+    assert '@chassis_number' in sql
+    assert '@odometer_lower' in sql and '@odometer_upper' in sql
+    assert 'APPROX_QUANTILES' in odometer_bounds_sql('proj.dataset.telemetry', 'bigquery')
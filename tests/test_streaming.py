@@ -0,0 +1,57 @@
+import pandas as pd
+import pytest
+
+from daily_rollup import DailyRollup
+from quantile_sketch import KLLSketch
+from streaming import csv_batches, frame_batches, rollup_from_batches
+
+pytest.importorskip('pyarrow')
+
+# Two days at six-hour spacing; the deltas across midnight are 5 km and -5 % SOC
+TELEMETRY = pd.DataFrame({
+    'chassis_number': 'C1',
+    'recorded_at': pd.date_range('2024-01-01', periods=8, freq='6h'),
+    'odometer': [0.0, 10, 20, 30, 35, 45, 45, 60],
+    'soc': [100.0, 90, 80, 95, 90, 70, 60, 80],
+    'key_on': [1, 1, 0, 1, 1, 1, 0, 0]
+})
+
+
+@pytest.mark.parametrize('batch_rows', [1, 3, 5, 8])
+def test_batches_splitting_a_day_match_the_one_shot_rollup(batch_rows):
+    daily = rollup_from_batches(frame_batches(TELEMETRY, batch_rows))
+
+    pd.testing.assert_frame_equal(daily, DailyRollup.from_frame(TELEMETRY))
+    assert list(daily['distance']) == [30, 30]
+    assert list(daily['distance_positive']) == [30, 25]
+    assert list(daily['soc_discharge']) == [20, 30]
+    assert list(daily['soc_charge']) == [15, 20]
+    assert list(daily['key_on_samples']) == [3, 2]
+
+
+def test_other_chassis_rows_are_skipped():
+    other = TELEMETRY.assign(chassis_number='C2', odometer=TELEMETRY['odometer'] * 100)
+    mixed = pd.concat([TELEMETRY, other]).sort_values(by='recorded_at', kind='stable')
+
+    daily = rollup_from_batches(frame_batches(mixed, 3), chassis_number='C1')
+
+    assert list(daily['distance']) == [30, 30]
+
+
+def test_sketch_drops_readings_outside_its_bounds():
+    glitched = TELEMETRY.copy()
+    glitched.loc[5, 'odometer'] = 10_000
+    sketch = KLLSketch().update(TELEMETRY['odometer'].values)
+
+    daily = rollup_from_batches(frame_batches(glitched, 3), sketch=sketch)
+
+    pd.testing.assert_frame_equal(daily, DailyRollup.from_frame(TELEMETRY.drop(index=5)))
+
+
+def test_csv_export_streams_like_the_frame(tmp_path):
+    path = tmp_path / 'telemetry.csv'
+    TELEMETRY.to_csv(path, index=False)
+
+    daily = rollup_from_batches(csv_batches(str(path)))
+
+    pd.testing.assert_frame_equal(daily, DailyRollup.from_frame(TELEMETRY), check_dtype=False, check_index_type=False)
@@ -0,0 +1,125 @@
+import os
+
+import pandas as pd
+
+from synthetic import generate_telemetry
+from telemetry_cache import TelemetryCache
+
+TELEMETRY = generate_telemetry('SYN00001', days=10, cadence='10min')
+
+
+class RecordingFetch:
+    def __init__(self, df=TELEMETRY):
+        self.df = df
+        self.calls = []
+
+    def __call__(self, oem, chassis_number, start_date, end_date):
+        self.calls.append((start_date, end_date))
+        recorded_at = self.df['recorded_at'].dt.tz_localize(None)
+        in_range = (recorded_at >= pd.Timestamp(start_date)) & (recorded_at <= pd.Timestamp(end_date))
+        return self.df[in_range].reset_index(drop=True)
+
+
+def test_repeat_load_is_served_from_partitions(tmp_path):
+    fetch = RecordingFetch()
+    cache = TelemetryCache(str(tmp_path), fetch)
+
+    first = cache.load('Piaggio', 'SYN00001', '2024-01-02', '2024-01-04 23:59:59')
+    second = cache.load('Piaggio', 'SYN00001', '2024-01-02', '2024-01-04 23:59:59')
+
+    assert len(fetch.calls) == 1
+    assert len(first) == len(second) == 3 * 144
+    assert pd.to_datetime(second['recorded_at']).is_monotonic_increasing
+    assert len(os.listdir(tmp_path / 'Piaggio' / 'SYN00001')) == 3
+
+
+def test_only_missing_days_are_fetched(tmp_path):
+    fetch = RecordingFetch()
+    cache = TelemetryCache(str(tmp_path), fetch)
+
+    cache.load('Piaggio', 'SYN00001', '2024-01-03', '2024-01-03 23:59:59')
+    cache.load('Piaggio', 'SYN00001', '2024-01-06', '2024-01-06 23:59:59')
+    df = cache.load('Piaggio', 'SYN00001', '2024-01-02', '2024-01-07 23:59:59')
+
+    assert fetch.calls[2:] == [
+        ('2024-01-02 00:00:00', '2024-01-02 23:59:59'),
+        ('2024-01-04 00:00:00', '2024-01-05 23:59:59'),
+        ('2024-01-07 00:00:00', '2024-01-07 23:59:59')
+    ]
+    assert len(df) == 6 * 144
+
+
+def test_least_recently_read_partitions_are_evicted(tmp_path):
+    fetch = RecordingFetch()
+    cache = TelemetryCache(str(tmp_path), fetch)
+    cache.load('Piaggio', 'SYN00001', '2024-01-01', '2024-01-01 23:59:59')
+    cache.max_bytes = 2.5 * cache.size_bytes()
+    cache.load('Piaggio', 'SYN00001', '2024-01-02', '2024-01-02 23:59:59')
+
+    # Reading 2024-01-01 again leaves 2024-01-02 the least recently read;
+    # the third partition takes the cache past two and a half days' worth
+    cache.load('Piaggio', 'SYN00001', '2024-01-01', '2024-01-01 23:59:59')
+    cache.load('Piaggio', 'SYN00001', '2024-01-03', '2024-01-03 23:59:59')
+
+    assert sorted(os.listdir(tmp_path / 'Piaggio' / 'SYN00001')) == ['2024-01-01.parquet', '2024-01-03.parquet']
+    assert cache.size_bytes() <= cache.max_bytes
+
+
+def test_cache_hits_do_not_walk_the_cache(tmp_path, monkeypatch):
+    cache = TelemetryCache(str(tmp_path), RecordingFetch())
+    cache.load('Piaggio', 'SYN00001', '2024-01-02', '2024-01-04 23:59:59')
+
+    def walk(root):
+        raise AssertionError("cache hit walked the cache directory")
+
+    monkeypatch.setattr(os, 'walk', walk)
+    assert len(cache.load('Piaggio', 'SYN00001', '2024-01-02', '2024-01-04 23:59:59')) == 3 * 144
+
+
+def test_partitions_written_by_another_process_are_used(tmp_path):
+    TelemetryCache(str(tmp_path), RecordingFetch()).load('Piaggio', 'SYN00001', '2024-01-02', '2024-01-02 23:59:59')
+    fetch = RecordingFetch()
+    cache = TelemetryCache(str(tmp_path), fetch)
+    cache.size_bytes()
+    TelemetryCache(str(tmp_path), RecordingFetch()).load('Piaggio', 'SYN00001', '2024-01-03', '2024-01-03 23:59:59')
+
+    cache.load('Piaggio', 'SYN00001', '2024-01-02', '2024-01-03 23:59:59')
+
+    assert fetch.calls == []
+
+
+def test_invalidate_refetches(tmp_path):
+    fetch = RecordingFetch()
+    cache = TelemetryCache(str(tmp_path), fetch)
+    cache.load('Piaggio', 'SYN00001', '2024-01-02', '2024-01-02 23:59:59')
+    cache.invalidate('Piaggio', 'SYN00001')
+    cache.load('Piaggio', 'SYN00001', '2024-01-02', '2024-01-02 23:59:59')
+
+    assert len(fetch.calls) == 2
+
+
+def test_recent_partitions_are_refetched_after_ttl(tmp_path):
+    fetch = RecordingFetch()
+    cache = TelemetryCache(str(tmp_path), fetch)
+    yesterday = pd.Timestamp.now().normalize() - pd.Timedelta(days=1)
+    day = yesterday.strftime('%Y-%m-%d')
+
+    cache.load('Piaggio', 'SYN00001', day, f'{day} 23:59:59')
+    cache.load('Piaggio', 'SYN00001', day, f'{day} 23:59:59')
+    assert len(fetch.calls) == 1
+
+    # Packets may still arrive for recent days, even ones that came back empty
+    cache.recent_ttl = 0
+    cache.load('Piaggio', 'SYN00001', day, f'{day} 23:59:59')
+    assert len(fetch.calls) == 2
+
+
+def test_old_partitions_do_not_expire(tmp_path):
+    fetch = RecordingFetch()
+    cache = TelemetryCache(str(tmp_path), fetch)
+    cache.load('Piaggio', 'SYN00001', '2024-01-02', '2024-01-02 23:59:59')
+
+    cache.recent_ttl = 0
+    cache.load('Piaggio', 'SYN00001', '2024-01-02', '2024-01-02 23:59:59')
+
+    assert len(fetch.calls) == 1
@@ -0,0 +1,93 @@
+import os
+import threading
+
+import pandas as pd
+
+TELEMETRY_TABLE = os.environ.get("TELEMETRY_TABLE", "telematics.{oem}_telemetry")
+PAGE_SIZE = 50000
+
+RAW_TELEMETRY_SQL = """
+SELECT chassis_number, recorded_at, odometer, soc, key_on
+FROM `{table}`
+WHERE chassis_number = @chassis_number
+  AND recorded_at BETWEEN @start_date AND @end_date
+ORDER BY recorded_at
+"""
+
+_client = None
+_client_lock = threading.Lock()
+
+
+def get_client():
+    """One BigQuery client per process; it is thread-safe and keeps its HTTP connections open."""
+    global _client
+    with _client_lock:
+        if _client is None:
+            from google.cloud import bigquery
+
+            _client = bigquery.Client()
+        return _client
+
+
+def telemetry_table(oem):
+    return TELEMETRY_TABLE.format(oem=oem.lower())
+
+
+def query_parameters(chassis_number, start_date, end_date):
+    from google.cloud import bigquery
+
+    return [
+        bigquery.ScalarQueryParameter("chassis_number", "STRING", chassis_number),
+        bigquery.ScalarQueryParameter("start_date", "TIMESTAMP", pd.Timestamp(start_date).to_pydatetime()),
+        bigquery.ScalarQueryParameter("end_date", "TIMESTAMP", pd.Timestamp(end_date).to_pydatetime())
+    ]
+
+
+def record_batches(oem, chassis_number, start_date, end_date, client=None, page_size=PAGE_SIZE):
+    """Raw telemetry for one chassis as a stream of Arrow record batches, oldest first."""
+    from google.cloud import bigquery
+
+    client = client or get_client()
+    job_config = bigquery.QueryJobConfig(query_parameters=query_parameters(chassis_number, start_date, end_date))
+    job = client.query(RAW_TELEMETRY_SQL.format(table=telemetry_table(oem)), job_config=job_config)
+    return job.result(page_size=page_size).to_arrow_iterable()
+
+
+def fetch_telemetry(oem, chassis_number, start_date, end_date, client=None):
+    """Raw telemetry for one chassis on the shared client; the fetch behind the dashboard, API and batch runner."""
+    from google.cloud import bigquery
+
+    client = client or get_client()
+    job_config = bigquery.QueryJobConfig(query_parameters=query_parameters(chassis_number, start_date, end_date))
+    job = client.query(RAW_TELEMETRY_SQL.format(table=telemetry_table(oem)), job_config=job_config)
+    return job.result().to_dataframe()
+
+
+def load_odometer_bounds_from_bigquery(oem, chassis_number, start_date, end_date, client=None):
+    """Odometer IQR bounds from approximate quartiles computed inside BigQuery, or None without readings."""
+    from google.cloud import bigquery
+
+    from sql_pushdown import bounds_from_sql_result, odometer_bounds_sql
+
+    client = client or get_client()
+    job_config = bigquery.QueryJobConfig(query_parameters=query_parameters(chassis_number, start_date, end_date))
+    job = client.query(odometer_bounds_sql(telemetry_table(oem), 'bigquery'), job_config=job_config)
+    return bounds_from_sql_result(job.result().to_dataframe())
+
+
+def load_daily_rollup_from_bigquery(oem, chassis_number, start_date, end_date, odometer_bounds=None, client=None):
+    """Per-day rollup computed inside BigQuery; only one row per day is transferred."""
+    from google.cloud import bigquery
+
+    from sql_pushdown import daily_rollup_sql, rollup_from_sql_result
+
+    client = client or get_client()
+    parameters = query_parameters(chassis_number, start_date, end_date)
+    if odometer_bounds is not None:
+        parameters += [
+            bigquery.ScalarQueryParameter("odometer_lower", "FLOAT64", float(odometer_bounds[0])),
+            bigquery.ScalarQueryParameter("odometer_upper", "FLOAT64", float(odometer_bounds[1]))
+        ]
+    sql = daily_rollup_sql(telemetry_table(oem), 'bigquery', odometer_bounds is not None)
+    job = client.query(sql, job_config=bigquery.QueryJobConfig(query_parameters=parameters))
+    return rollup_from_sql_result(job.result().to_dataframe())